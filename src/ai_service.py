@@ -1,24 +1,201 @@
-"""AI service layer for interacting with various AI backends."""
+"""AI service layer for interacting with various AI backends.
+
+All requests run on the AsyncExecutor loop in window.py, which uses uvloop
+when it is installed.
+"""
 
 import asyncio
-import json
 import time
+import importlib.util
 from abc import ABC, abstractmethod
-from typing import AsyncIterator, Dict, List, Optional
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING, AsyncIterator, Dict, List, Optional, Set
 
-import httpx
+# httpx is imported when the first client is created, keeping it off the
+# startup path until a request is actually made
+if TYPE_CHECKING:
+    import httpx
 
 from src.constants import (
     HTTP_TIMEOUT,
     MAX_KEEPALIVE_CONNECTIONS,
     MAX_CONNECTIONS,
+    KEEPALIVE_EXPIRY,
+    MAX_CACHED_CLIENTS,
+)
+from src.logger import (
+    STREAM_LOG_INTERVAL,
+    get_logger,
+    log_ai_request,
+    log_ai_response,
+    log_ai_stream_chunk,
 )
-from src.logger import get_logger, log_ai_request, log_ai_response, log_ai_stream_chunk
+from src import json_utils
 
 # Configure logging
 logger = get_logger(__name__)
 
 
+# Server-sent events framing used by OpenAI-compatible streams
+_SSE_PREFIX = b"data: "
+_SSE_PREFIX_LEN = len(_SSE_PREFIX)
+_SSE_DONE = b"data: [DONE]"
+
+# Ask OpenAI-compatible APIs to report token usage at the end of the stream
+_OPENAI_STREAM_OPTIONS = {"include_usage": True}
+
+# Hosts where HTTP/2 buys nothing over a local connection
+_LOOPBACK_HOSTS = frozenset({"localhost", "127.0.0.1", "::1"})
+
+# Shared clients keyed by endpoint, least recently used first; credentials are
+# sent per request, so changing an API key reuses the same client. All
+# requests run on the one AsyncExecutor loop, so a client is never used across
+# event loops.
+_CLIENT_CACHE: "OrderedDict[str, httpx.AsyncClient]" = OrderedDict()
+
+# Number of requests currently using each client
+_CLIENT_USERS: "Dict[httpx.AsyncClient, int]" = {}
+
+# Clients evicted from the cache while in use, closed when their last request ends
+_EVICTED_CLIENTS: "Set[httpx.AsyncClient]" = set()
+
+# Close tasks of evicted clients, referenced until they finish
+_CLOSING_TASKS: Set[asyncio.Task] = set()
+
+
+def _get_client(endpoint: str) -> "httpx.AsyncClient":
+    """Get the shared HTTP client for an endpoint, creating it on first use.
+
+    Services and model-list refreshes for the same endpoint reuse one
+    connection pool instead of opening their own. Only MAX_CACHED_CLIENTS are
+    kept: endpoints tried while typing in Preferences would otherwise leave
+    their clients and connections open for the life of the process.
+
+    Must be called on the AsyncExecutor loop.
+
+    Args:
+        endpoint: Base URL of the service
+
+    Returns:
+        The shared client
+    """
+    client = _CLIENT_CACHE.get(endpoint)
+    if client is not None and not client.is_closed:
+        _CLIENT_CACHE.move_to_end(endpoint)
+        return client
+
+    client = _CLIENT_CACHE[endpoint] = _create_client(endpoint)
+    _CLIENT_CACHE.move_to_end(endpoint)
+    # Drop the least recently used clients beyond the limit; one still
+    # streaming a response is closed once its last request ends
+    while len(_CLIENT_CACHE) > MAX_CACHED_CLIENTS:
+        _, stale = _CLIENT_CACHE.popitem(last=False)
+        if stale in _CLIENT_USERS:
+            _EVICTED_CLIENTS.add(stale)
+        else:
+            _close_client(stale)
+    return client
+
+
+def _close_client(client: "httpx.AsyncClient"):
+    """Close a client in the background.
+
+    Args:
+        client: The client to close
+    """
+    task = asyncio.get_running_loop().create_task(client.aclose())
+    _CLOSING_TASKS.add(task)
+    task.add_done_callback(_CLOSING_TASKS.discard)
+
+
+@asynccontextmanager
+async def _client_in_use(endpoint: str) -> AsyncIterator["httpx.AsyncClient"]:
+    """Hold the shared client for an endpoint for the length of a request.
+
+    A client evicted from the cache while held stays open until the last
+    request using it finishes, so eviction never cuts off a running stream.
+
+    Args:
+        endpoint: Base URL of the service
+
+    Yields:
+        The shared client
+    """
+    client = _get_client(endpoint)
+    _CLIENT_USERS[client] = _CLIENT_USERS.get(client, 0) + 1
+    try:
+        yield client
+    finally:
+        users = _CLIENT_USERS.pop(client) - 1
+        if users:
+            _CLIENT_USERS[client] = users
+        elif client in _EVICTED_CLIENTS:
+            _EVICTED_CLIENTS.discard(client)
+            _close_client(client)
+
+
+def _create_client(endpoint: str) -> "httpx.AsyncClient":
+    """Create an HTTP client for an endpoint.
+
+    HTTP/2 is used for remote hosts when the h2 package is installed, so
+    concurrent requests share one TLS connection. Idle connections are kept
+    for KEEPALIVE_EXPIRY seconds so consecutive requests skip the handshake.
+
+    Accept-Encoding is left to httpx: it always advertises gzip and deflate,
+    adds br and zstd when brotli or zstandard are installed, and decodes the
+    response before the stream is read.
+
+    Args:
+        endpoint: Base URL of the service
+
+    Returns:
+        The configured client
+    """
+    import httpx
+
+    # h2 enables HTTP/2 in httpx; only check that it is installed
+    http2_available = importlib.util.find_spec("h2") is not None
+    use_http2 = http2_available and httpx.URL(endpoint).host not in _LOOPBACK_HOSTS
+    return httpx.AsyncClient(
+        http2=use_http2,
+        timeout=HTTP_TIMEOUT,
+        limits=httpx.Limits(
+            max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+            max_connections=MAX_CONNECTIONS,
+            keepalive_expiry=KEEPALIVE_EXPIRY,
+        ),
+    )
+
+
+async def _aiter_byte_lines(response: "httpx.Response") -> AsyncIterator[bytes]:
+    """Iterate over the lines of a streamed response as raw bytes.
+
+    Reading bytes and splitting them here skips httpx's text decoding and
+    per-line decoder; the JSON parser accepts bytes directly.
+
+    Args:
+        response: The streaming response
+
+    Yields:
+        Each line without its line terminator
+    """
+    buf = bytearray()
+    async for chunk in response.aiter_bytes():
+        buf += chunk
+        end = buf.rfind(b"\n")
+        if end < 0:
+            continue
+        # Split all complete lines at once and keep the partial one buffered
+        lines = bytes(buf[:end]).splitlines()
+        del buf[: end + 1]
+        for line in lines:
+            yield line
+
+    if buf:
+        yield bytes(buf)
+
+
 class AIService(ABC):
     """Abstract base class for AI services."""
 
@@ -48,6 +225,17 @@ class AIService(ABC):
         """Close the service and cleanup resources."""
         pass
 
+    def _use_client(self):
+        """Hold the shared HTTP client for this service during one request.
+
+        Subclasses set ``endpoint``, and pass ``_headers`` with each request
+        since the client is shared by every service using the endpoint.
+
+        Returns:
+            Async context manager yielding the client
+        """
+        return _client_in_use(self.endpoint)
+
     def get_last_token_usage(self) -> tuple[Optional[int], Optional[int]]:
         """Get token usage from last request.
 
@@ -64,18 +252,14 @@ class OllamaService(AIService):
         super().__init__()
         self.endpoint = endpoint.rstrip("/")
         self.model = model
-        self.client = httpx.AsyncClient(
-            timeout=HTTP_TIMEOUT,
-            limits=httpx.Limits(
-                max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS, max_connections=MAX_CONNECTIONS
-            ),
-        )
-        self._cancel_event = asyncio.Event()
+        self._headers = {"Content-Type": "application/json"}
+        # Request body fields that are the same for every request
+        self._body_template = {"model": model, "stream": True}
+        self._cancelled = False
 
     def cancel(self):
         """Cancel the current streaming request."""
-        if self._cancel_event:
-            self._cancel_event.set()
+        self._cancelled = True
 
     async def stream_completion(
         self,
@@ -83,13 +267,12 @@ class OllamaService(AIService):
         system_prompt: Optional[str] = None,
     ) -> AsyncIterator[str]:
         """Stream completion from Ollama."""
-        # Prepare messages
-        formatted_messages = []
-
+        # Prepare messages; without a system prompt the caller's list is sent
+        # as is (it is only read, and must not be changed during the stream)
         if system_prompt:
-            formatted_messages.append({"role": "system", "content": system_prompt})
-
-        formatted_messages.extend(messages)
+            formatted_messages = [{"role": "system", "content": system_prompt}, *messages]
+        else:
+            formatted_messages = messages
 
         # Log request
         log_ai_request(
@@ -100,30 +283,28 @@ class OllamaService(AIService):
             metadata={"service": "ollama"},
         )
 
-        # Create cancel event
-        self._cancel_event = asyncio.Event()
+        # Reset cancel flag (a plain bool: nothing ever awaits cancellation)
+        self._cancelled = False
 
-        start_time = time.time()
-        full_response = ""
+        start_time = time.perf_counter()
+        chunks: List[str] = []
+        total_len = 0
         chunk_count = 0
         error_msg = None
         tokens_input = None
         tokens_output = None
 
         try:
-            async with self.client.stream(
+            async with self._use_client() as client, client.stream(
                 "POST",
                 f"{self.endpoint}/api/chat",
-                json={
-                    "model": self.model,
-                    "messages": formatted_messages,
-                    "stream": True,
-                },
+                content=json_utils.dumps({**self._body_template, "messages": formatted_messages}),
+                headers=self._headers,
             ) as response:
                 response.raise_for_status()
 
-                async for line in response.aiter_lines():
-                    if self._cancel_event.is_set():
+                async for line in _aiter_byte_lines(response):
+                    if self._cancelled:
                         # logger.info(f"Ollama request cancelled: {self.model}")
                         return  # Use return instead of break to exit generator properly
 
@@ -131,18 +312,20 @@ class OllamaService(AIService):
                         continue
 
                     try:
-                        data = json.loads(line)
+                        data = json_utils.loads(line)
                         if "message" in data and "content" in data["message"]:
                             content = data["message"]["content"]
                             if content:
-                                full_response += content
+                                chunks.append(content)
+                                total_len += len(content)
                                 chunk_count += 1
-                                log_ai_stream_chunk(
-                                    model=self.model,
-                                    chunk_num=chunk_count,
-                                    chunk_size=len(content),
-                                    total_size=len(full_response),
-                                )
+                                if chunk_count % STREAM_LOG_INTERVAL == 0:
+                                    log_ai_stream_chunk(
+                                        model=self.model,
+                                        chunk_num=chunk_count,
+                                        chunk_size=len(content),
+                                        total_size=total_len,
+                                    )
                                 yield content
 
                         if data.get("done", False):
@@ -154,20 +337,14 @@ class OllamaService(AIService):
                                 tokens_output = data["eval_count"]
                                 self.last_tokens_output = tokens_output
                             break
-                    except json.JSONDecodeError:
+                    except json_utils.JSONDecodeError:
                         continue
 
-            # Ensure tokens are stored (in case they weren't set in the loop)
-            if tokens_input is not None:
-                self.last_tokens_input = tokens_input
-            if tokens_output is not None:
-                self.last_tokens_output = tokens_output
-
             # Log successful response
-            duration = time.time() - start_time
+            duration = time.perf_counter() - start_time
             log_ai_response(
                 model=self.model,
-                response=full_response,
+                response="".join(chunks),
                 duration=duration,
                 success=True,
                 metadata={"service": "ollama", "chunks": chunk_count},
@@ -177,11 +354,11 @@ class OllamaService(AIService):
 
         except Exception as e:
             error_msg = str(e)
-            duration = time.time() - start_time
+            duration = time.perf_counter() - start_time
             logger.error(f"Ollama streaming error: {e}")
             log_ai_response(
                 model=self.model,
-                response=full_response,
+                response="".join(chunks),
                 duration=duration,
                 success=False,
                 error=error_msg,
@@ -189,12 +366,13 @@ class OllamaService(AIService):
             )
             raise
         finally:
-            self._cancel_event = None
+            self._cancelled = False
 
     async def list_models(self) -> List[str]:
         """List available Ollama models."""
         try:
-            response = await self.client.get(f"{self.endpoint}/api/tags")
+            async with self._use_client() as client:
+                response = await client.get(f"{self.endpoint}/api/tags", headers=self._headers)
             response.raise_for_status()
             data = response.json()
             return [model["name"] for model in data.get("models", [])]
@@ -203,8 +381,8 @@ class OllamaService(AIService):
             return []
 
     async def close(self):
-        """Close the HTTP client."""
-        await self.client.aclose()
+        """Release the service; the shared HTTP client stays open for reuse."""
+        pass
 
 
 class OpenAICompatibleService(AIService):
@@ -222,25 +400,24 @@ class OpenAICompatibleService(AIService):
         self.model = model
         self.api_key = api_key
         self.model_type = model_type
+        # Request body fields that are the same for every request
+        self._body_template = {
+            "model": model,
+            "stream": True,
+            "stream_options": _OPENAI_STREAM_OPTIONS,
+        }
 
         # Setup headers
         headers = {"Content-Type": "application/json"}
         if api_key:
             headers["Authorization"] = f"Bearer {api_key}"
 
-        self.client = httpx.AsyncClient(
-            timeout=HTTP_TIMEOUT,
-            headers=headers,
-            limits=httpx.Limits(
-                max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS, max_connections=MAX_CONNECTIONS
-            ),
-        )
-        self._cancel_event = asyncio.Event()
+        self._headers = headers
+        self._cancelled = False
 
     def cancel(self):
         """Cancel the current streaming request."""
-        if self._cancel_event:
-            self._cancel_event.set()
+        self._cancelled = True
 
     async def stream_completion(
         self,
@@ -248,13 +425,12 @@ class OpenAICompatibleService(AIService):
         system_prompt: Optional[str] = None,
     ) -> AsyncIterator[str]:
         """Stream completion from OpenAI-compatible API."""
-        # Prepare messages
-        formatted_messages = []
-
+        # Prepare messages; without a system prompt the caller's list is sent
+        # as is (it is only read, and must not be changed during the stream)
         if system_prompt:
-            formatted_messages.append({"role": "system", "content": system_prompt})
-
-        formatted_messages.extend(messages)
+            formatted_messages = [{"role": "system", "content": system_prompt}, *messages]
+        else:
+            formatted_messages = messages
 
         # Log request
         log_ai_request(
@@ -265,11 +441,12 @@ class OpenAICompatibleService(AIService):
             metadata={"service": "openai_compatible"},
         )
 
-        # Create cancel event
-        self._cancel_event = asyncio.Event()
+        # Reset cancel flag (a plain bool: nothing ever awaits cancellation)
+        self._cancelled = False
 
-        start_time = time.time()
-        full_response = ""
+        start_time = time.perf_counter()
+        chunks: List[str] = []
+        total_len = 0
         chunk_count = 0
         error_msg = None
         tokens_input = None
@@ -281,31 +458,29 @@ class OpenAICompatibleService(AIService):
             url = f"{self.endpoint}/chat/completions"
 
         try:
-            async with self.client.stream(
+            async with self._use_client() as client, client.stream(
                 "POST",
                 url,
-                json={
-                    "model": self.model,
-                    "messages": formatted_messages,
-                    "stream": True,
-                    "stream_options": {"include_usage": True},  # Request usage info
-                },
+                content=json_utils.dumps({**self._body_template, "messages": formatted_messages}),
+                headers=self._headers,
             ) as response:
                 response.raise_for_status()
 
-                async for line in response.aiter_lines():
-                    if self._cancel_event.is_set():
+                async for line in _aiter_byte_lines(response):
+                    if self._cancelled:
                         # logger.info(f"OpenAI-compatible request cancelled: {self.model}")
                         return  # Use return instead of break to exit generator properly
 
-                    if not line or not line.startswith("data: "):
+                    # Empty lines fail the prefix check as well
+                    if not line.startswith(_SSE_PREFIX):
                         continue
 
-                    if line == "data: [DONE]":
+                    if line == _SSE_DONE:
                         break
 
                     try:
-                        data = json.loads(line[6:])  # Remove "data: " prefix
+                        # Remove "data: " prefix without copying the line
+                        data = json_utils.loads(memoryview(line)[_SSE_PREFIX_LEN:])
 
                         # Extract usage info if available
                         if "usage" in data and data["usage"] is not None:
@@ -322,29 +497,25 @@ class OpenAICompatibleService(AIService):
                             delta = data["choices"][0].get("delta", {})
                             content = delta.get("content")
                             if content:
-                                full_response += content
+                                chunks.append(content)
+                                total_len += len(content)
                                 chunk_count += 1
-                                log_ai_stream_chunk(
-                                    model=self.model,
-                                    chunk_num=chunk_count,
-                                    chunk_size=len(content),
-                                    total_size=len(full_response),
-                                )
+                                if chunk_count % STREAM_LOG_INTERVAL == 0:
+                                    log_ai_stream_chunk(
+                                        model=self.model,
+                                        chunk_num=chunk_count,
+                                        chunk_size=len(content),
+                                        total_size=total_len,
+                                    )
                                 yield content
-                    except json.JSONDecodeError:
+                    except json_utils.JSONDecodeError:
                         continue
 
-            # Ensure tokens are stored (fallback)
-            if tokens_input is not None:
-                self.last_tokens_input = tokens_input
-            if tokens_output is not None:
-                self.last_tokens_output = tokens_output
-
             # Log successful response
-            duration = time.time() - start_time
+            duration = time.perf_counter() - start_time
             log_ai_response(
                 model=self.model,
-                response=full_response,
+                response="".join(chunks),
                 duration=duration,
                 success=True,
                 metadata={"service": "openai_compatible", "chunks": chunk_count},
@@ -354,11 +525,11 @@ class OpenAICompatibleService(AIService):
 
         except Exception as e:
             error_msg = str(e)
-            duration = time.time() - start_time
+            duration = time.perf_counter() - start_time
             logger.error(f"OpenAI-compatible streaming error: {e}")
             log_ai_response(
                 model=self.model,
-                response=full_response,
+                response="".join(chunks),
                 duration=duration,
                 success=False,
                 error=error_msg,
@@ -366,12 +537,13 @@ class OpenAICompatibleService(AIService):
             )
             raise
         finally:
-            self._cancel_event = None
+            self._cancelled = False
 
     async def list_models(self) -> List[str]:
         """List available models (not supported by all APIs)."""
         try:
-            response = await self.client.get(f"{self.endpoint}/v1/models")
+            async with self._use_client() as client:
+                response = await client.get(f"{self.endpoint}/v1/models", headers=self._headers)
             response.raise_for_status()
             data = response.json()
             return [model["id"] for model in data.get("data", [])]
@@ -380,8 +552,8 @@ class OpenAICompatibleService(AIService):
             return []
 
     async def close(self):
-        """Close the HTTP client."""
-        await self.client.aclose()
+        """Release the service; the shared HTTP client stays open for reuse."""
+        pass
 
 
 def create_ai_service(
@@ -403,28 +575,17 @@ def create_ai_service(
         raise ValueError(f"Unknown model type: {model_type}")
 
 
-def _filter_gpt_models(models: List[str]) -> List[str]:
-    import re
-
-    filtered = []
-    for model in models:
-        model_lower = model.lower()
-
-        # Only include specific base models
-        # Allowed patterns: gpt-4o, gpt-4o-mini, gpt-4.1, gpt-5o, gpt-5o-mini, gpt-5.0, etc.
-        # But exclude things like gpt-4-turbo, gpt-4-vision, etc.
-        allowed_patterns = [
-            r"^gpt-4o(-mini)?$",  # gpt-4o, gpt-4o-mini
-            r"^gpt-4\.1(-mini)?$",  # gpt-4.1, gpt-4.1-mini
-            r"^gpt-5o(-mini)?$",  # gpt-5o, gpt-5o-mini
-            r"^gpt-5\.0(-mini)?$",  # gpt-5.0, gpt-5.0-mini
-            r"^gpt-5(-mini)?$",  # gpt-5, gpt-5-mini
-        ]
+# Base GPT models offered for selection (gpt-4o, gpt-4.1, gpt-5o, gpt-5.0, gpt-5
+# and their -mini variants); variants like gpt-4-turbo or gpt-4-vision are left out
+_ALLOWED_GPT_MODELS = frozenset(
+    f"{base}{suffix}"
+    for base in ("gpt-4o", "gpt-4.1", "gpt-5o", "gpt-5.0", "gpt-5")
+    for suffix in ("", "-mini")
+)
 
-        if any(re.match(pattern, model_lower) for pattern in allowed_patterns):
-            filtered.append(model)
 
-    return filtered
+def _filter_gpt_models(models: List[str]) -> List[str]:
+    return [model for model in models if model.lower() in _ALLOWED_GPT_MODELS]
 
 
 async def fetch_available_models(
@@ -454,7 +615,8 @@ async def fetch_available_models(
         ]
 
     try:
-        # Create temporary service instance
+        # Temporary service instance; it borrows the shared client, so there
+        # is no connection setup or teardown per refresh
         temp_service = create_ai_service(
             model_type=model_type,
             endpoint=endpoint,
@@ -465,12 +627,6 @@ async def fetch_available_models(
         # Fetch models
         models = await temp_service.list_models()
 
-        # Clean up - ensure client is fully closed
-        await temp_service.close()
-
-        # Give httpx more time to cleanup internal tasks
-        await asyncio.sleep(0.1)
-
         # Filter models based on type
         if model_type == "api":
             models = _filter_gpt_models(models)
@@ -128,6 +128,12 @@ class PopupAIApplication(Adw.Application):
         # Register custom D-Bus interface
         self._register_dbus_interface()
 
+    def do_shutdown(self):
+        """Called when the application shuts down."""
+        # Write settings changes still waiting for their debounced save
+        self.settings.flush()
+        Adw.Application.do_shutdown(self)
+
     def _register_dbus_interface(self):
         """Register custom D-Bus interface for receiving ShowWindow calls."""
         try:
@@ -1,10 +1,14 @@
 """Configuration and settings management."""
 
-import json
+import os
 import logging
+import functools
+import tempfile
+import threading
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any, Dict, List, Optional
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter
 
 from src.constants import (
     DEFAULT_WINDOW_WIDTH,
@@ -24,17 +28,46 @@ from src.constants import (
     PROMPTS_FILE_NAME,
     MODELS_FILE_NAME,
     CONVERSATIONS_DIR_NAME,
+    CONVERSATION_LOAD_WORKERS,
+    SETTINGS_SAVE_DELAY,
 )
 from src.ui_strings import DEFAULT_PROMPTS
+from src import json_utils
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+def _atomic_write_json(path: Path, obj: Any):
+    """Write JSON to a file so readers never see a partially written file.
+
+    The data goes to a uniquely named temporary file next to the target, which
+    then replaces it in one rename, so concurrent writers never share a file.
+
+    Args:
+        path: Destination file
+        obj: JSON-serializable object
+    """
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=path.name + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(json_utils.dumps(obj, pretty=True))
+        os.replace(tmp_name, path)
+    except BaseException:
+        # Don't leave the temporary file behind
+        try:
+            os.unlink(tmp_name)
+        except OSError:
+            pass
+        raise
+
+
 class ModelConfig(BaseModel):
     """AI model configuration."""
 
+    model_config = ConfigDict(extra="ignore")
+
     name: str
     type: str  # "ollama" or "api"
     endpoint: Optional[str] = None
@@ -45,6 +78,8 @@ class ModelConfig(BaseModel):
 class PromptTemplate(BaseModel):
     """Prompt template configuration."""
 
+    model_config = ConfigDict(extra="ignore")
+
     name: str
     system_prompt: str
     description: Optional[str] = None
@@ -54,6 +89,8 @@ class PromptTemplate(BaseModel):
 class ConversationMessage(BaseModel):
     """A single message in the conversation."""
 
+    model_config = ConfigDict(extra="ignore")
+
     role: str  # "user" or "assistant"
     content: str
     timestamp: float
@@ -64,6 +101,8 @@ class ConversationMessage(BaseModel):
 class Conversation(BaseModel):
     """A conversation history."""
 
+    model_config = ConfigDict(extra="ignore")
+
     id: str
     title: str
     messages: List[ConversationMessage] = Field(default_factory=list)
@@ -71,13 +110,35 @@ class Conversation(BaseModel):
     updated_at: float
 
 
+@functools.cache
+def _list_adapter(item_type: type) -> TypeAdapter:
+    """Get a validator for a JSON list of models, built on first use."""
+    return TypeAdapter(List[item_type])
+
+
+def _load_conversation_file(conv_file: str) -> Optional[Conversation]:
+    """Load one conversation file.
+
+    Args:
+        conv_file: Path to the conversation JSON file
+
+    Returns:
+        The conversation, or None if the file could not be loaded
+    """
+    try:
+        with open(conv_file, "rb") as f:
+            # Parse and validate in one pass in pydantic-core
+            return Conversation.model_validate_json(f.read())
+    except Exception as e:
+        logger.error(f"Failed to load conversation {conv_file}: {e}")
+        return None
+
+
 class Settings:
     """Application settings manager."""
 
     def __init__(self):
         # Use XDG base directories (respects Flatpak sandbox)
-        import os
-
         xdg_config_home = os.environ.get("XDG_CONFIG_HOME", str(Path.home() / ".config"))
         xdg_data_home = os.environ.get("XDG_DATA_HOME", str(Path.home() / ".local" / "share"))
 
@@ -93,11 +154,57 @@ class Settings:
         self.data_dir.mkdir(parents=True, exist_ok=True)
         self.conversations_dir.mkdir(parents=True, exist_ok=True)
 
+        # Debounced config saves: set() marks the config dirty and (re)starts
+        # a timer; the lock guards the dict against the timer thread
+        self._config_lock = threading.Lock()
+        self._config_dirty = False
+        self._save_timer: Optional[threading.Timer] = None
+
+        # Prompt edits are written by one background thread; the flag keeps
+        # at most one write queued, which saves the latest prompts when it runs
+        self._prompts_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="prompts")
+        self._prompts_lock = threading.Lock()
+        self._prompts_write_pending = False
+
+        # Reused for every history load; threads start on first use and then
+        # stay idle instead of being created for each load
+        self._conversation_pool = ThreadPoolExecutor(
+            max_workers=CONVERSATION_LOAD_WORKERS, thread_name_prefix="conversations"
+        )
+
         # Load or create default config
         self.config = self._load_config()
         self.models = self._load_models()
         self.prompts = self._load_prompts()
 
+    @property
+    def models(self) -> List[ModelConfig]:
+        """Configured models."""
+        return self._models
+
+    @models.setter
+    def models(self, models: List[ModelConfig]):
+        self._models = models
+        self._reindex_models()
+
+    @property
+    def prompts(self) -> List[PromptTemplate]:
+        """Configured prompt templates."""
+        return self._prompts
+
+    @prompts.setter
+    def prompts(self, prompts: List[PromptTemplate]):
+        self._prompts = prompts
+        self._reindex_prompts()
+
+    def _reindex_models(self):
+        """Rebuild the name lookup for models (first entry wins on duplicates)."""
+        self._models_index = {m.name: m for m in reversed(self._models)}
+
+    def _reindex_prompts(self):
+        """Rebuild the name lookup for prompts (first entry wins on duplicates)."""
+        self._prompts_index = {p.name: p for p in reversed(self._prompts)}
+
     def _load_config(self) -> Dict[str, Any]:
         """Load application configuration."""
         default_config = {
@@ -123,28 +230,32 @@ class Settings:
 
         if self.config_file.exists():
             try:
-                with open(self.config_file, "r", encoding="utf-8") as f:
-                    loaded_config = json.load(f)
-
-                    # Migration: convert old single font to list format
-                    if (
-                        "webview_font_family" in loaded_config
-                        and "webview_font_families" not in loaded_config
-                    ):
-                        old_font = loaded_config.pop("webview_font_family")
-                        if isinstance(old_font, str) and old_font:
-                            loaded_config["webview_font_families"] = [old_font]
-
-                    # Ensure webview_font_families is a list
-                    if "webview_font_families" in loaded_config:
-                        if not isinstance(loaded_config["webview_font_families"], list):
-                            loaded_config["webview_font_families"] = [
-                                str(loaded_config["webview_font_families"])
-                            ]
-                        elif not loaded_config["webview_font_families"]:
-                            loaded_config["webview_font_families"] = DEFAULT_WEBVIEW_FONT_FAMILIES
-
-                    return {**default_config, **loaded_config}
+                loaded_config = json_utils.loads(self.config_file.read_bytes())
+
+                # Migration: convert old single font to list format
+                if (
+                    "webview_font_family" in loaded_config
+                    and "webview_font_families" not in loaded_config
+                ):
+                    old_font = loaded_config.pop("webview_font_family")
+                    if isinstance(old_font, str) and old_font:
+                        loaded_config["webview_font_families"] = [old_font]
+
+                # Ensure webview_font_families is a list
+                if "webview_font_families" in loaded_config:
+                    if not isinstance(loaded_config["webview_font_families"], list):
+                        loaded_config["webview_font_families"] = [
+                            str(loaded_config["webview_font_families"])
+                        ]
+                    elif not loaded_config["webview_font_families"]:
+                        loaded_config["webview_font_families"] = DEFAULT_WEBVIEW_FONT_FAMILIES
+                    else:
+                        # Font rows are keyed by family, so drop duplicates
+                        loaded_config["webview_font_families"] = list(
+                            dict.fromkeys(loaded_config["webview_font_families"])
+                        )
+
+                return {**default_config, **loaded_config}
             except Exception as e:
                 logger.error(f"Failed to load config: {e}")
 
@@ -155,8 +266,7 @@ class Settings:
     def _save_config(self, config: Dict[str, Any]):
         """Save application configuration."""
         try:
-            with open(self.config_file, "w", encoding="utf-8") as f:
-                json.dump(config, f, indent=2)
+            _atomic_write_json(self.config_file, config)
         except Exception as e:
             logger.error(f"Failed to save config: {e}")
 
@@ -164,9 +274,7 @@ class Settings:
         """Load model configurations."""
         if self.models_file.exists():
             try:
-                with open(self.models_file, "r", encoding="utf-8") as f:
-                    models_data = json.load(f)
-                    return [ModelConfig(**m) for m in models_data]
+                return _list_adapter(ModelConfig).validate_json(self.models_file.read_bytes())
             except Exception as e:
                 logger.error(f"Failed to load models: {e}")
 
@@ -176,61 +284,106 @@ class Settings:
     def save_models(self, models: List[ModelConfig]):
         """Save model configurations."""
         try:
-            with open(self.models_file, "w", encoding="utf-8") as f:
-                json.dump([m.model_dump() for m in models], f, indent=2)
+            _atomic_write_json(self.models_file, [m.model_dump() for m in models])
             self.models = models
         except Exception as e:
             logger.error(f"Failed to save models: {e}")
 
     def _load_prompts(self) -> List[PromptTemplate]:
         """Load prompt templates."""
-        default_prompts = [PromptTemplate(**prompt_data) for prompt_data in DEFAULT_PROMPTS]
-
         if self.prompts_file.exists():
             try:
-                with open(self.prompts_file, "r", encoding="utf-8") as f:
-                    prompts_data = json.load(f)
-                    return [PromptTemplate(**p) for p in prompts_data]
+                return _list_adapter(PromptTemplate).validate_json(self.prompts_file.read_bytes())
             except Exception as e:
                 logger.error(f"Failed to load prompts: {e}")
 
-        # Save default prompts
+        # Save default prompts; only built when there is no usable file
+        default_prompts = [PromptTemplate(**prompt_data) for prompt_data in DEFAULT_PROMPTS]
         self.save_prompts(default_prompts)
         return default_prompts
 
     def save_prompts(self, prompts: List[PromptTemplate]):
         """Save prompt templates."""
         try:
-            with open(self.prompts_file, "w", encoding="utf-8") as f:
-                json.dump([p.model_dump() for p in prompts], f, indent=2)
+            _atomic_write_json(self.prompts_file, [p.model_dump() for p in prompts])
             self.prompts = prompts
         except Exception as e:
             logger.error(f"Failed to save prompts: {e}")
 
+    def _schedule_prompts_save(self):
+        """Write the prompts file in the background, coalescing bursts of edits."""
+        with self._prompts_lock:
+            if self._prompts_write_pending:
+                return
+            self._prompts_write_pending = True
+        self._prompts_writer.submit(self._write_prompts)
+
+    def _write_prompts(self):
+        """Write the current prompts (runs on the writer thread)."""
+        with self._prompts_lock:
+            self._prompts_write_pending = False
+            prompts = list(self.prompts)
+        try:
+            _atomic_write_json(self.prompts_file, [p.model_dump() for p in prompts])
+        except Exception as e:
+            logger.error(f"Failed to save prompts: {e}")
+
     def get(self, key: str, default: Any = None) -> Any:
         """Get a configuration value."""
         return self.config.get(key, default)
 
     def set(self, key: str, value: Any):
-        """Set a configuration value."""
-        self.config[key] = value
-        self._save_config(self.config)
+        """Set a configuration value.
+
+        The file is written SETTINGS_SAVE_DELAY seconds after the last change,
+        so bursts of changes (e.g. resizing) cause a single write.
+        """
+        self.update({key: value})
+
+    def update(self, values: dict[str, Any]):
+        """Set several configuration values at once.
+
+        All values are applied under one lock acquisition and share a single
+        delayed write, the same as one call to set().
+
+        Args:
+            values: Mapping of configuration keys to their new values
+        """
+        if not values:
+            return
+        with self._config_lock:
+            self.config.update(values)
+            self._config_dirty = True
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+            self._save_timer = threading.Timer(SETTINGS_SAVE_DELAY, self.flush)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+
+    def flush(self):
+        """Write pending configuration changes now."""
+        with self._config_lock:
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+                self._save_timer = None
+            if not self._config_dirty:
+                return
+            self._config_dirty = False
+            # Written under the lock so a timer flush can't land after a newer one
+            self._save_config(self.config)
 
     def get_model(self, name: str) -> Optional[ModelConfig]:
         """Get a model by name."""
-        for model in self.models:
-            if model.name == name:
-                return model
-        return None
+        return self._models_index.get(name)
 
     def add_model(self, model: ModelConfig):
         """Add a new model configuration."""
         # Check if model with same name exists and update it
-        for i, existing_model in enumerate(self.models):
-            if existing_model.name == model.name:
-                self.models[i] = model
-                self.save_models(self.models)
-                return
+        existing_model = self._models_index.get(model.name)
+        if existing_model is not None:
+            self.models[self.models.index(existing_model)] = model
+            self.save_models(self.models)
+            return
 
         # Add new model
         self.models.append(model)
@@ -243,48 +396,56 @@ class Settings:
 
     def get_prompt(self, name: str) -> Optional[PromptTemplate]:
         """Get a prompt template by name."""
-        for prompt in self.prompts:
-            if prompt.name == name:
-                return prompt
-        return None
+        return self._prompts_index.get(name)
+
+    def has_prompt(self, name: str) -> bool:
+        """Check whether a prompt template with this name exists."""
+        return name in self._prompts_index
 
     def add_prompt(self, prompt: PromptTemplate):
-        """Add a new prompt template."""
-        # Check if prompt with same name exists and update it
-        for i, existing_prompt in enumerate(self.prompts):
-            if existing_prompt.name == prompt.name:
-                self.prompts[i] = prompt
-                self.save_prompts(self.prompts)
-                return
+        """Add a new prompt template.
 
-        # Add new prompt
-        self.prompts.append(prompt)
-        self.save_prompts(self.prompts)
+        The in-memory list is updated right away; the file is written in the
+        background.
+        """
+        # Check if prompt with same name exists and update it
+        existing_prompt = self._prompts_index.get(prompt.name)
+        if existing_prompt is not None:
+            self.prompts[self.prompts.index(existing_prompt)] = prompt
+        else:
+            self.prompts.append(prompt)
+        self._reindex_prompts()
+        self._schedule_prompts_save()
 
     def remove_prompt(self, name: str):
-        """Remove a prompt template."""
+        """Remove a prompt template; the file is written in the background."""
         self.prompts = [p for p in self.prompts if p.name != name]
-        self.save_prompts(self.prompts)
+        self._schedule_prompts_save()
 
     def save_conversation(self, conversation: Conversation):
         """Save a conversation to disk."""
         try:
             conv_file = self.conversations_dir / f"{conversation.id}.json"
-            with open(conv_file, "w", encoding="utf-8") as f:
-                json.dump(conversation.model_dump(), f, indent=2)
+            _atomic_write_json(conv_file, conversation.model_dump())
         except Exception as e:
             logger.error(f"Failed to save conversation: {e}")
 
     def load_conversations(self) -> List[Conversation]:
         """Load all conversations."""
-        conversations = []
-        for conv_file in self.conversations_dir.glob("*.json"):
-            try:
-                with open(conv_file, "r", encoding="utf-8") as f:
-                    conv_data = json.load(f)
-                    conversations.append(Conversation(**conv_data))
-            except Exception as e:
-                logger.error(f"Failed to load conversation {conv_file}: {e}")
+        # scandir reports file types from the directory listing itself
+        with os.scandir(self.conversations_dir) as entries:
+            conv_files = [
+                entry.path
+                for entry in entries
+                if entry.name.endswith(".json") and entry.is_file()
+            ]
+
+        # Reads release the GIL, so a few threads overlap the file I/O
+        conversations = [
+            conv
+            for conv in self._conversation_pool.map(_load_conversation_file, conv_files)
+            if conv is not None
+        ]
 
         # Sort by updated_at descending
         conversations.sort(key=lambda c: c.updated_at, reverse=True)
@@ -298,3 +459,11 @@ class Settings:
                 conv_file.unlink()
         except Exception as e:
             logger.error(f"Failed to delete conversation {conversation_id}: {e}")
+
+    def delete_all_conversations(self):
+        """Delete all conversations without loading them first."""
+        for conv_file in self.conversations_dir.glob("*.json"):
+            try:
+                conv_file.unlink()
+            except Exception as e:
+                logger.error(f"Failed to delete conversation {conv_file}: {e}")
@@ -29,6 +29,8 @@ DEFAULT_PERPLEXITY_ENDPOINT = "https://api.perplexity.ai"
 HTTP_TIMEOUT = 120.0
 MAX_KEEPALIVE_CONNECTIONS = 5
 MAX_CONNECTIONS = 10
+KEEPALIVE_EXPIRY = 60.0  # Keep idle connections for reuse between requests
+MAX_CACHED_CLIENTS = 4  # Shared HTTP clients kept open, one per endpoint
 
 # Conversation Settings
 MAX_HISTORY = 50
@@ -38,6 +40,7 @@ STREAMING_UPDATE_INTERVAL = 0.05  # 50ms for smoother streaming
 # Thread Pool Settings
 ASYNC_EXECUTOR_MAX_WORKERS = 3
 ASYNC_EXECUTOR_THREAD_PREFIX = "async-exec"
+CONVERSATION_LOAD_WORKERS = 8  # Threads used to read conversation files
 
 # UI Layout Settings
 MARGIN_SMALL = 6
@@ -79,6 +82,11 @@ CONFIG_FILE_NAME = "config.json"
 PROMPTS_FILE_NAME = "prompts.json"
 MODELS_FILE_NAME = "models.json"
 CONVERSATIONS_DIR_NAME = "conversations"
+SETTINGS_SAVE_DELAY = 0.5  # Seconds to coalesce config changes before writing
+PREFERENCES_NOTIFY_DELAY_MS = 300  # Quiet period before typed settings apply
+SPIN_COMMIT_DELAY_MS = 150  # Quiet period before a spin row value is saved
+PREFERENCES_SAVE_DELAY_MS = 200  # Batching window for preference edits
+PROMPT_EDITOR_UNDO_LEVELS = 20  # Undo steps kept while editing a system prompt
 
 # Logging
 LOG_LEVEL = "INFO"
@@ -1,11 +1,76 @@
 """HTML template for conversation display."""
 
-from src.constants import MATHJAX_CDN_URL
+import functools
+import hashlib
+import os
+import re
+import sys
+from collections.abc import Mapping
+from pathlib import Path
+from string import Template
+from types import MappingProxyType
+from typing import Final, Optional
+from urllib.parse import urlsplit
 
+from src.constants import APP_SUBDIR, MATHJAX_CDN_URL
+from src.json_utils import dumps_str
+from src.logger import get_logger
 
-def get_mathjax_config() -> str:
-    """Get MathJax configuration JavaScript."""
-    return r"""
+logger = get_logger(__name__)
+
+# The stylesheet is written here so the webview can cache it between loads
+ASSET_DIR = (
+    Path(os.environ.get("XDG_CACHE_HOME", str(Path.home() / ".cache"))) / APP_SUBDIR / "webview"
+)
+
+# Assets whose versions left over from earlier runs have been removed
+_PRUNED_ASSETS: set[str] = set()
+
+# Origin of the MathJax CDN, for connection hints
+_MATHJAX_ORIGIN = "{0.scheme}://{0.netloc}".format(urlsplit(MATHJAX_CDN_URL))
+
+# Set POPUP_AI_NO_MINIFY=1 to ship the CSS and JS as written, for debugging
+_DEBUG_NO_MINIFY = bool(os.environ.get("POPUP_AI_NO_MINIFY"))
+
+_CSS_COMMENT_RE = re.compile(r"/\*.*?\*/", re.DOTALL)
+_CSS_SPACE_RE = re.compile(r"\s+")
+# Whitespace around these is insignificant. Not around ":" in general, since
+# "a ::selection" and "a::selection" are different selectors.
+_CSS_PUNCT_SPACE_RE = re.compile(r"\s*([{};,])\s*|(:)\s+")
+# Template placeholders such as {name}; their braces aren't CSS punctuation
+_CSS_PLACEHOLDER_RE = re.compile(r"\{\w+\}")
+
+
+def _minify_css(css: str) -> str:
+    """Strip comments and insignificant whitespace from CSS."""
+    if _DEBUG_NO_MINIFY:
+        return css
+    # Swap placeholders for brace-free tokens so the space in front of one
+    # (e.g. "1px solid {border}") is kept, then put them back
+    placeholders = _CSS_PLACEHOLDER_RE.findall(css)
+    css = _CSS_PLACEHOLDER_RE.sub("\0", css)
+    css = _CSS_COMMENT_RE.sub("", css)
+    css = _CSS_SPACE_RE.sub(" ", css)
+    css = _CSS_PUNCT_SPACE_RE.sub(r"\1\2", css).strip()
+    parts = css.split("\0")
+    return "".join(part + placeholder for part, placeholder in zip(parts, placeholders)) + parts[-1]
+
+
+def _minify_js(js: str) -> str:
+    """Strip indentation, blank lines and comment lines from JavaScript.
+
+    Line breaks are kept so automatic semicolon insertion and trailing
+    comments behave as before.
+    """
+    if _DEBUG_NO_MINIFY:
+        return js
+    lines = (line.strip() for line in js.splitlines())
+    return "\n".join(line for line in lines if line and not line.startswith("//"))
+
+
+# MathJax configuration JavaScript
+MATHJAX_CONFIG: Final[str] = _minify_js(
+    r"""
     window.MathJax = {
         tex: {
             inlineMath: [['$', '$'], ['\\(', '\\)']],
@@ -31,116 +96,115 @@ def get_mathjax_config() -> str:
         }
     };
     """
+    # Loaded on demand by the conversation script once math shows up
+    f"var mathJaxUrl = {dumps_str(MATHJAX_CDN_URL)};"
+)
+
+
+def _theme_vars(colors: dict[str, str]) -> Mapping[str, str]:
+    """Freeze a theme's colors, interning the values shared across templates."""
+    return MappingProxyType({name: sys.intern(value) for name, value in colors.items()})
+
+
+# Theme colors; read-only since the same mappings are shared by every caller
+_DARK_VARS = _theme_vars(
+    {
+        "bg_color": "#1e1e1e",
+        "text_color": "#e0e0e0",
+        "user_bg": "#2563eb",
+        "user_header_bg": "#1e40af",
+        "assistant_bg": "#262626",
+        "assistant_header_bg": "#333333",
+        "code_bg": "#1a1a1a",
+        "pre_bg": "#1a1a1a",
+        "pre_text": "#d4d4d4",
+        "border_color": "#404040",
+        "table_header_bg": "#1a1a1a",
+        "shadow": "0 2px 8px rgba(0, 0, 0, 0.8)",
+        "quote_border": "rgba(255, 255, 255, 0.4)",
+        "quote_text": "rgba(255, 255, 255, 0.85)",
+        "link_color": "#60a5fa",
+        "link_hover_color": "#93c5fd",
+    }
+)
+
+_LIGHT_VARS = _theme_vars(
+    {
+        "bg_color": "#ffffff",
+        "text_color": "#2e3436",
+        "user_bg": "#3584e4",
+        "user_header_bg": "#1c71d8",
+        "assistant_bg": "#ffffff",
+        "assistant_header_bg": "rgba(0, 0, 0, 0.05)",
+        "code_bg": "rgba(0, 0, 0, 0.05)",
+        "pre_bg": "#f6f8fa",
+        "pre_text": "#2e3436",
+        "border_color": "#ddd",
+        "table_header_bg": "#f6f8fa",
+        "shadow": "0 1px 3px rgba(0, 0, 0, 0.1)",
+        "quote_border": "rgba(0, 0, 0, 0.2)",
+        "quote_text": "rgba(0, 0, 0, 0.7)",
+        "link_color": "#1a73e8",
+        "link_hover_color": "#1557b0",
+    }
+)
 
 
-def get_css_variables(is_dark: bool) -> dict:
+def get_css_variables(is_dark: bool) -> Mapping[str, str]:
     """Get CSS variables based on theme."""
-    if is_dark:
-        return {
-            "bg_color": "#1e1e1e",
-            "text_color": "#e0e0e0",
-            "user_bg": "#2563eb",
-            "user_header_bg": "#1e40af",
-            "assistant_bg": "#262626",
-            "assistant_header_bg": "#333333",
-            "code_bg": "#1a1a1a",
-            "pre_bg": "#1a1a1a",
-            "pre_text": "#d4d4d4",
-            "border_color": "#404040",
-            "table_header_bg": "#1a1a1a",
-            "shadow": "0 2px 8px rgba(0, 0, 0, 0.8)",
-            "quote_border": "rgba(255, 255, 255, 0.4)",
-            "quote_text": "rgba(255, 255, 255, 0.85)",
-            "link_color": "#60a5fa",
-            "link_hover_color": "#93c5fd",
-        }
-    else:
-        return {
-            "bg_color": "#ffffff",
-            "text_color": "#2e3436",
-            "user_bg": "#3584e4",
-            "user_header_bg": "#1c71d8",
-            "assistant_bg": "#ffffff",
-            "assistant_header_bg": "rgba(0, 0, 0, 0.05)",
-            "code_bg": "rgba(0, 0, 0, 0.05)",
-            "pre_bg": "#f6f8fa",
-            "pre_text": "#2e3436",
-            "border_color": "#ddd",
-            "table_header_bg": "#f6f8fa",
-            "shadow": "0 1px 3px rgba(0, 0, 0, 0.1)",
-            "quote_border": "rgba(0, 0, 0, 0.2)",
-            "quote_text": "rgba(0, 0, 0, 0.7)",
-            "link_color": "#1a73e8",
-            "link_hover_color": "#1557b0",
-        }
-
-
-def get_conversation_styles(font_family: str, font_size: int, css_vars: dict) -> str:
-    """Get conversation styles CSS."""
-    return f"""
-        :root {{
-            --bg-color: {css_vars['bg_color']};
-            --text-color: {css_vars['text_color']};
-            --user-bg: {css_vars['user_bg']};
-            --user-header-bg: {css_vars['user_header_bg']};
-            --assistant-bg: {css_vars['assistant_bg']};
-            --assistant-header-bg: {css_vars['assistant_header_bg']};
-            --code-bg: {css_vars['code_bg']};
-            --pre-bg: {css_vars['pre_bg']};
-            --pre-text: {css_vars['pre_text']};
-            --border-color: {css_vars['border_color']};
-            --table-header-bg: {css_vars['table_header_bg']};
-            --shadow: {css_vars['shadow']};
-            --quote-border: {css_vars['quote_border']};
-            --quote-text: {css_vars['quote_text']};
-            --link-color: {css_vars['link_color']};
-            --link-hover-color: {css_vars['link_hover_color']};
-        }}
-        
-        * {{
+    return _DARK_VARS if is_dark else _LIGHT_VARS
+
+
+# Stylesheet template. Theme colors are inlined once per theme below instead of
+# going through CSS custom properties, which the webview would otherwise
+# resolve on every style recalculation. Only $font_family and $font_size are
+# left for each call.
+_CSS_TEMPLATE = Template(
+    """
+        * {
             margin: 0;
             padding: 0;
             box-sizing: border-box;
-        }}
+        }
         
-        ::selection {{
+        ::selection {
             background-color: rgba(100, 150, 255, 0.3);
-        }}
+        }
         
-        body {{
-            font-family: {font_family}, -apple-system, BlinkMacSystemFont, "Segoe UI", Roboto, "Helvetica Neue", Arial, sans-serif;
-            font-size: {font_size}px;
+        body {
+            font-family: ${font_family}, -apple-system, BlinkMacSystemFont, "Segoe UI", Roboto, "Helvetica Neue", Arial, sans-serif;
+            font-size: ${font_size}px;
             padding: 16px;
             background: transparent;
-            color: var(--text-color);
-        }}
-        .message {{
+            color: ${text_color};
+        }
+        .message {
             margin-bottom: 16px;
             max-width: 85%;
-        }}
-        .message.user {{
+        }
+        .message.user {
             margin-left: auto;
-        }}
-        .message.assistant {{
+        }
+        .message.assistant {
             margin-right: auto;
-        }}
-        .message-header {{
+        }
+        .message-header {
             font-weight: 600;
             font-size: 0.85em;
             padding: 8px 12px;
-            background: var(--assistant-header-bg);
+            background: ${assistant_header_bg};
             border-radius: 8px 8px 0 0;
             display: flex;
             justify-content: space-between;
             align-items: center;
-        }}
-        .token-info {{
+        }
+        .token-info {
             font-weight: 400;
             font-size: 0.9em;
             opacity: 0.7;
             margin-left: 8px;
-        }}
-        .copy-btn {{
+        }
+        .copy-btn {
             background: none;
             border: none;
             cursor: pointer;
@@ -149,264 +213,568 @@ def get_conversation_styles(font_family: str, font_size: int, css_vars: dict) ->
             transition: opacity 0.2s;
             display: flex;
             align-items: center;
-        }}
-        .copy-btn:hover {{
+        }
+        .copy-btn:hover {
             opacity: 1;
-        }}
-        .copy-btn svg {{
+        }
+        .copy-btn svg {
             width: 16px;
             height: 16px;
-        }}
-        .message.user .copy-btn {{
+        }
+        .message.user .copy-btn {
             color: white;
-        }}
-        .message-content {{
+        }
+        .message-content {
             padding: 12px;
-            background: var(--assistant-bg);
+            background: ${assistant_bg};
             border-radius: 0 0 8px 8px;
-            box-shadow: var(--shadow);
+            box-shadow: ${shadow};
             line-height: 1.6;
             word-wrap: break-word;
             overflow-wrap: break-word;
             overflow: hidden;
-        }}
-        .message.user .message-content {{
-            background: var(--user-bg);
+        }
+        .message.user .message-content {
+            background: ${user_bg};
             color: #ffffff;
-        }}
-        .message.user .message-content ::selection {{
+        }
+        .message.user .message-content ::selection {
             background-color: rgba(255, 255, 255, 0.3);
-        }}
-        .message.user .message-header {{
-            background: var(--user-header-bg);
+        }
+        .message.user .message-header {
+            background: ${user_header_bg};
             color: #ffffff;
-        }}
-        .message-content p {{
+        }
+        .message-content p {
             margin-bottom: 0.5em;
-        }}
-        .message-content p:last-child {{
+        }
+        .message-content p:last-child {
             margin-bottom: 0;
-        }}
+        }
         .message-content ul,
-        .message-content ol {{
+        .message-content ol {
             margin: 8px 0;
             padding-left: 24px;
             overflow: hidden;
-        }}
-        .message-content li {{
+        }
+        .message-content li {
             margin-bottom: 4px;
             word-wrap: break-word;
             overflow-wrap: break-word;
-        }}
-        .message-content code {{
-            background: var(--code-bg);
+        }
+        .message-content code {
+            background: ${code_bg};
             padding: 2px 6px;
             border-radius: 3px;
             font-family: "Fira Code", "Courier New", monospace;
             font-size: 0.9em;
             word-wrap: break-word;
             overflow-wrap: break-word;
-        }}
-        .message.user .message-content code {{
+        }
+        .message.user .message-content code {
             background: rgba(255, 255, 255, 0.2);
-        }}
-        .message-content pre {{
-            background: var(--pre-bg);
-            color: var(--pre-text);
+        }
+        .message-content pre {
+            background: ${pre_bg};
+            color: ${pre_text};
             padding: 12px;
             border-radius: 6px;
             overflow-x: auto;
             margin: 8px 0;
             max-width: 100%;
-        }}
-        .message-content pre code {{
+        }
+        .message-content pre code {
             background: none;
             color: inherit;
             padding: 0;
             white-space: pre;
-        }}
+        }
         .message-content .MathJax,
-        .message-content mjx-container {{
+        .message-content mjx-container {
             max-width: 100%;
             overflow-x: auto;
             overflow-y: hidden;
             display: block;
             margin: 8px 0;
-        }}
-        .message-content mjx-container[display="true"] {{
+        }
+        .message-content mjx-container[display="true"] {
             overflow-x: auto;
             overflow-y: hidden;
-        }}
-        .message-content mjx-container:not([display="true"]) {{
+        }
+        .message-content mjx-container:not([display="true"]) {
             display: inline-block;
             max-width: 100%;
             overflow-x: auto;
             vertical-align: middle;
-        }}
-        .message-content table {{
+        }
+        .message-content table {
             border-collapse: collapse;
             width: 100%;
             margin: 8px 0;
             display: block;
             overflow-x: auto;
             max-width: 100%;
-        }}
-        .message-content th, .message-content td {{
-            border: 1px solid var(--border-color);
+        }
+        .message-content th, .message-content td {
+            border: 1px solid ${border_color};
             padding: 8px;
             text-align: left;
-        }}
-        .message-content th {{
-            background: var(--table-header-bg);
+        }
+        .message-content th {
+            background: ${table_header_bg};
             font-weight: 600;
-        }}
-        .message-content blockquote {{
-            border-left: 4px solid var(--quote-border);
+        }
+        .message-content blockquote {
+            border-left: 4px solid ${quote_border};
             padding-left: 12px;
             margin: 8px 0;
-            color: var(--quote-text);
-        }}
-        .message.user .message-content blockquote {{
+            color: ${quote_text};
+        }
+        .message.user .message-content blockquote {
             border-left-color: rgba(255, 255, 255, 0.5);
             color: rgba(255, 255, 255, 0.9);
-        }}
-        .message-content a {{
-            color: var(--link-color);
+        }
+        .message-content a {
+            color: ${link_color};
             text-decoration: none;
-        }}
-        .message-content a:hover {{
-            color: var(--link-hover-color);
+        }
+        .message-content a:hover {
+            color: ${link_hover_color};
             text-decoration: underline;
-        }}
-        .message.user .message-content a {{
+        }
+        .message.user .message-content a {
             color: #a8d5ff;
-        }}
+        }
     """
+)
+
+
+def _bake_theme(css_vars: Mapping[str, str]) -> Template:
+    """Substitute theme colors into the minified stylesheet template."""
+    minified = Template(_minify_css(_CSS_TEMPLATE.template))
+    # Keep the font placeholders for get_conversation_styles
+    return Template(minified.safe_substitute(css_vars))
+
+
+_CSS_TEMPLATE_DARK = _bake_theme(_DARK_VARS)
+_CSS_TEMPLATE_LIGHT = _bake_theme(_LIGHT_VARS)
+
+
+def get_conversation_styles(font_family: str, font_size: int, is_dark: bool) -> str:
+    """Get conversation styles CSS."""
+    template = _CSS_TEMPLATE_DARK if is_dark else _CSS_TEMPLATE_LIGHT
+    return template.substitute(font_family=font_family, font_size=font_size)
 
 
-def get_conversation_scripts(user_scrolled: bool) -> str:
-    """Get conversation JavaScript code."""
-    return f"""
+# Conversation JavaScript. It is static; per-render state is read from the
+# document (the user-scrolled flag comes from a data attribute on <body>).
+_CONVERSATION_JS = _minify_js(
+    """
         // Copy message source code
-        function copyMessage(idx) {{
-            var messages = document.querySelectorAll('.message-content');
-            if (idx < messages.length) {{
-                var rawContent = messages[idx].getAttribute('data-raw');
-                if (rawContent) {{
-                    // Decode HTML entities
-                    var textarea = document.createElement('textarea');
-                    textarea.innerHTML = rawContent;
-                    var decodedContent = textarea.value;
-                    
+        function copyMessage(idx) {
+            var el = document.getElementById('msg-' + idx);
+            if (el) {
+                // A streaming message keeps its source so far on the element;
+                // getAttribute already undoes the attribute escaping
+                var rawContent = el.streamRaw !== undefined ? el.streamRaw : el.getAttribute('data-raw');
+                if (rawContent) {
                     // Copy to clipboard
-                    navigator.clipboard.writeText(decodedContent).then(function() {{
+                    navigator.clipboard.writeText(rawContent).then(function() {
                         // Show feedback
                         var btn = event.target.closest('.copy-btn');
-                        if (btn) {{
-                            var originalHTML = btn.innerHTML;
-                            btn.innerHTML = '<svg width="16" height="16" viewBox="0 0 16 16" fill="currentColor"><path d="M13.5 2.5l-8 8-3-3"/></svg>';
-                            setTimeout(function() {{
-                                btn.innerHTML = originalHTML;
-                            }}, 1000);
-                        }}
-                    }}).catch(function(err) {{
+                        if (btn) {
+                            var originalIcon = Array.from(btn.childNodes);
+                            var doneIcon = document.getElementById('copy-done-icon');
+                            btn.replaceChildren(doneIcon.content.cloneNode(true));
+                            setTimeout(function() {
+                                btn.replaceChildren.apply(btn, originalIcon);
+                            }, 1000);
+                        }
+                    }).catch(function(err) {
                         console.error('Copy failed:', err);
-                    }});
-                }}
-            }}
-        }}
+                    });
+                }
+            }
+        }
+        
+        // Message being streamed into, looked up once per stream
+        var streamTarget = null;
+        var streamTargetIdx = -1;
+        
+        // Append a chunk to message idx: newly finished blocks are inserted
+        // before the trailing block, which is the only part that gets replaced.
+        // The markdown source grows the same way, for copying mid-stream.
+        function appendMessageChunk(idx, stableDelta, tailHtml, rawDelta, reset) {
+            if (reset || streamTargetIdx !== idx || !streamTarget || !streamTarget.isConnected) {
+                streamTarget = document.getElementById('msg-' + idx);
+                streamTargetIdx = idx;
+            }
+            if (!streamTarget) {
+                return null;
+            }
+            var tail = streamTarget.lastElementChild;
+            if (reset || !tail || !tail.classList.contains('stream-tail')) {
+                streamTarget.innerHTML = '<div class="stream-tail"></div>';
+                tail = streamTarget.lastElementChild;
+            }
+            if (stableDelta) {
+                tail.insertAdjacentHTML('beforebegin', stableDelta);
+            }
+            tail.innerHTML = tailHtml;
+            streamTarget.streamRaw = reset || streamTarget.streamRaw === undefined
+                ? rawDelta : streamTarget.streamRaw + rawDelta;
+            return streamTarget;
+        }
+        
+        // Entry point for streaming updates from Python; installed with the page
+        // so each update only evaluates a short call with the payloads
+        function updateStreamingMessage(idx, stableDelta, tailHtml, rawDelta, reset, userScrolled) {
+            var lastMessage = appendMessageChunk(idx, stableDelta, tailHtml, rawDelta, reset);
+            if (!lastMessage) {
+                return;
+            }
+            
+            // Re-render MathJax for this message (debounced)
+            if (window.mathJaxTimeout) clearTimeout(window.mathJaxTimeout);
+            window.mathJaxTimeout = setTimeout(function() {
+                triggerMathJax(lastMessage);
+            }, 100);
+            
+            // Auto-scroll if user hasn't scrolled manually
+            if (!userScrolled) {
+                var anchor = document.getElementById('scroll-anchor');
+                if (anchor) {
+                    anchor.scrollIntoView({block: 'end', behavior: 'auto'});
+                }
+            }
+        }
         
-        // Debounced MathJax typesetting
-        var mathJaxPending = false;
-        function triggerMathJax() {{
-            if (typeof MathJax !== 'undefined' && MathJax.typesetPromise && !mathJaxPending) {{
-                mathJaxPending = true;
-                MathJax.typesetPromise().catch(function(err) {{
-                    console.error('MathJax error:', err);
-                }}).finally(function() {{
-                    mathJaxPending = false;
-                }});
-            }}
-        }}
+        // Replace the streamed message with its final render
+        function finishStreamingMessage(idx, html, rawContent, userScrolled) {
+            var lastMessage = document.getElementById('msg-' + idx);
+            if (!lastMessage) {
+                return;
+            }
+            lastMessage.innerHTML = html;
+            lastMessage.setAttribute('data-raw', rawContent);
+            delete lastMessage.streamRaw;
+            
+            if (window.mathJaxTimeout) clearTimeout(window.mathJaxTimeout);
+            triggerMathJax(lastMessage);
+            
+            if (!userScrolled) {
+                var anchor = document.getElementById('scroll-anchor');
+                if (anchor) {
+                    anchor.scrollIntoView({block: 'end', behavior: 'auto'});
+                }
+            }
+        }
+        
+        // Replace the token usage badge in a message header
+        function setTokenInfo(idx, html) {
+            var content = document.getElementById('msg-' + idx);
+            if (!content) {
+                return;
+            }
+            var header = content.parentElement.querySelector('.message-header > span');
+            if (!header) {
+                return;
+            }
+            var existing = header.querySelector('.token-info');
+            if (existing) {
+                existing.remove();
+            }
+            if (html) {
+                header.insertAdjacentHTML('beforeend', html);
+            }
+        }
+        
+        // MathJax is only loaded once there is something that looks like math
+        var mathPattern = /\\$|\\\\\\(|\\\\\\[/;
+        function hasMath(element) {
+            return mathPattern.test(element.textContent);
+        }
+        
+        // Whether MathJax is ready; starts loading it if it isn't. Once loaded,
+        // its startup typesets the whole page.
+        function ensureMathJax() {
+            if (typeof MathJax !== 'undefined' && MathJax.typesetPromise) {
+                return true;
+            }
+            if (!document.getElementById('mathjax-script')) {
+                var script = document.createElement('script');
+                script.id = 'mathjax-script';
+                script.async = true;
+                script.src = mathJaxUrl;
+                document.head.appendChild(script);
+            }
+            return false;
+        }
+        
+        // Typeset only the given element (the whole page without one). Calls
+        // are chained since MathJax must not typeset concurrently.
+        var mathJaxChain = Promise.resolve();
+        function triggerMathJax(target) {
+            if (!hasMath(target || document.body) || !ensureMathJax()) {
+                return;
+            }
+            mathJaxChain = mathJaxChain.then(function() {
+                return MathJax.typesetPromise(target ? [target] : undefined);
+            }).catch(function(err) {
+                console.error('MathJax error:', err);
+            });
+        }
+        
+        // Swap in a new set of messages without reloading the page
+        function replaceMessages(html, userScrolled) {
+            var container = document.getElementById('messages');
+            container.innerHTML = html;
+            streamTarget = null;
+            document.body.dataset.userScrolled = String(userScrolled);
+            triggerMathJax(container);
+            if (!userScrolled) {
+                var anchor = document.getElementById('scroll-anchor');
+                if (anchor) {
+                    anchor.scrollIntoView({block: 'end'});
+                }
+            }
+        }
         
         // Trigger MathJax after DOM is ready
-        if (document.readyState === 'loading') {{
-            document.addEventListener('DOMContentLoaded', triggerMathJax);
-        }} else {{
+        if (document.readyState === 'loading') {
+            document.addEventListener('DOMContentLoaded', function() {
+                triggerMathJax();
+            });
+        } else {
             triggerMathJax();
-        }}
+        }
         
         // Save scroll position
         var scrollPos = sessionStorage.getItem('scrollPos');
-        var userScrolledFlag = {str(user_scrolled).lower()};
+        var userScrolledFlag = document.body.dataset.userScrolled === 'true';
         
-        // Notify Python when user manually scrolls (throttled)
-        var scrollTimeout;
-        window.addEventListener('scroll', function() {{
+        // Notify Python when user manually scrolls. The storage write and the
+        // message are batched into one idle callback instead of every frame.
+        var scheduleIdle = window.requestIdleCallback
+            ? function(cb) { window.requestIdleCallback(cb, { timeout: 150 }); }
+            : function(cb) { setTimeout(cb, 150); };
+        var scrollFlushPending = false;
+        function flushScroll() {
+            scrollFlushPending = false;
             sessionStorage.setItem('scrollPos', window.scrollY);
-            
-            if (scrollTimeout) clearTimeout(scrollTimeout);
-            scrollTimeout = setTimeout(function() {{
-                if (window.webkit && window.webkit.messageHandlers && window.webkit.messageHandlers.scrolled) {{
-                    window.webkit.messageHandlers.scrolled.postMessage('scroll');
-                }}
-            }}, 150);
-        }}, {{ passive: true }});
+            if (window.webkit && window.webkit.messageHandlers && window.webkit.messageHandlers.scrolled) {
+                window.webkit.messageHandlers.scrolled.postMessage('scroll');
+            }
+        }
+        window.addEventListener('scroll', function() {
+            if (!scrollFlushPending) {
+                scrollFlushPending = true;
+                scheduleIdle(flushScroll);
+            }
+        }, { passive: true });
         
         // Restore position or auto-scroll
-        if (userScrolledFlag && scrollPos !== null) {{
+        if (userScrolledFlag && scrollPos !== null) {
             window.scrollTo(0, parseInt(scrollPos));
-        }} else {{
+        } else {
             var anchor = document.getElementById('scroll-anchor');
-            if (anchor) {{
-                anchor.scrollIntoView({{block: 'end'}});
-            }}
+            if (anchor) {
+                anchor.scrollIntoView({block: 'end'});
+            }
             sessionStorage.setItem('scrollPos', window.scrollY);
-        }}
+        }
     """
+)
 
 
-def generate_html_template(
-    messages_html: str, font_family: str, font_size: int, is_dark: bool, user_scrolled: bool
-) -> str:
-    """Generate complete HTML template for conversation display.
+def _write_asset(name: str, suffix: str, content: str) -> Optional[Path]:
+    """Write a static asset to disk if needed and return its path.
+
+    The file name includes a hash of the content, so a theme or font change
+    gets a new file while unchanged assets stay cached by the webview. Versions
+    left over from earlier runs are removed on the first call for each asset;
+    versions written by this process stay, since the dark and light themes
+    switch between them.
+
+    Args:
+        name: Base name of the file
+        suffix: File extension including the dot
+        content: File content
+
+    Returns:
+        The file path, or None if the asset could not be written
+    """
+    digest = hashlib.sha1(content.encode()).hexdigest()[:12]
+    path = ASSET_DIR / f"{name}.{digest}{suffix}"
+    try:
+        if not path.exists():
+            ASSET_DIR.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_name(f"{path.name}.tmp")
+            tmp_path.write_text(content, encoding="utf-8")
+            os.replace(tmp_path, path)
+    except OSError as e:
+        logger.warning(f"Failed to write webview asset {path}, inlining it: {e}")
+        return None
+
+    if name not in _PRUNED_ASSETS:
+        _PRUNED_ASSETS.add(name)
+        _prune_assets(name, suffix, path)
+    return path
+
+
+def _prune_assets(name: str, suffix: str, keep: Path):
+    """Remove the other versions of an asset.
+
+    Args:
+        name: Base name of the asset
+        suffix: File extension including the dot
+        keep: The current version
+    """
+    for old_path in ASSET_DIR.glob(f"{name}.*{suffix}"):
+        if old_path != keep:
+            try:
+                old_path.unlink()
+            except OSError as e:
+                logger.debug(f"Failed to remove old webview asset {old_path}: {e}")
+
+
+@functools.lru_cache(maxsize=16)
+def _build_shell(
+    font_family: str, font_size: int, is_dark: bool, has_math: bool
+) -> tuple[bytes, bytes, Optional[Path]]:
+    """Build the document around the body content.
+
+    Everything except the body content depends only on the font, theme and
+    whether the messages contain math, so the result is cached and each render
+    just places the body in between.
 
     Args:
-        messages_html: HTML string containing all messages
         font_family: Font family to use
         font_size: Font size in pixels
         is_dark: Whether dark mode is active
-        user_scrolled: Whether user has manually scrolled
+        has_math: Whether to load MathJax with the page
 
     Returns:
-        Complete HTML document as string
+        Tuple of (head, suffix) as UTF-8 encoded HTML, and the stylesheet file
+        the head links to (None when it is inlined)
     """
-    css_vars = get_css_variables(is_dark)
-    styles = get_conversation_styles(font_family, font_size, css_vars)
-    scripts = get_conversation_scripts(user_scrolled)
-    mathjax_config = get_mathjax_config()
+    styles = get_conversation_styles(font_family, font_size, is_dark)
+
+    # Reference the stylesheet as a file so the webview can reuse its parsed
+    # copy across reloads, falling back to inlining it. The scripts stay
+    # inline: the window calls into them, so they must always be present.
+    styles_path = _write_asset("popup", ".css", styles)
+    if styles_path:
+        styles_tag = f'<link rel="stylesheet" href="{styles_path.as_uri()}">'
+    else:
+        styles_tag = f"<style>\n        {styles}\n    </style>"
+    mathjax_config_tag = f"<script>\n    {MATHJAX_CONFIG}\n    </script>"
+    scripts_tag = f"<script>\n        {_CONVERSATION_JS}\n    </script>"
 
-    return f"""<!DOCTYPE html>
+    # Without math in the initial messages the script loads MathJax on demand,
+    # so only resolve the CDN's name instead of opening a connection
+    if has_math:
+        mathjax_hint = f'<link rel="preconnect" href="{_MATHJAX_ORIGIN}">'
+        mathjax_tag = f'<script async id="mathjax-script" src="{MATHJAX_CDN_URL}"></script>'
+    else:
+        mathjax_hint = ""
+        mathjax_tag = ""
+
+    head = f"""<!DOCTYPE html>
 <html>
 <head>
     <meta charset="utf-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    {mathjax_hint}
+    <link rel="dns-prefetch" href="{_MATHJAX_ORIGIN}">
     <!-- MathJax configuration -->
-    <script>
-    {mathjax_config}
-    </script>
+    {mathjax_config_tag}
     <!-- Load MathJax asynchronously for better performance -->
-    <script async src="{MATHJAX_CDN_URL}"></script>
-    <style>
-        {styles}
-    </style>
+    {mathjax_tag}
+    {styles_tag}
 </head>
-<body>
-    {messages_html}
+"""
+    suffix = f"""</div>
     <div id="scroll-anchor"></div>
-    <script>
-        {scripts}
-    </script>
+    <template id="copy-done-icon"><svg width="16" height="16" viewBox="0 0 16 16" fill="currentColor"><path d="M13.5 2.5l-8 8-3-3"/></svg></template>
+    {scripts_tag}
 </body>
 </html>
 """
+    return head.encode(), suffix.encode(), styles_path
+
+
+def generate_chunk_update_js(
+    idx: int, stable_delta: str, tail_html: str, raw_delta: str, reset: bool, user_scrolled: bool
+) -> str:
+    """Build the JavaScript call that appends streamed content to a message.
+
+    Only the newly finished blocks and the unfinished tail are sent, so the
+    page does not have to be reloaded while a response streams in.
+
+    Args:
+        idx: Index of the message being streamed
+        stable_delta: HTML of the blocks finished since the last update
+        tail_html: HTML of the unfinished trailing block
+        raw_delta: Markdown source received since the last update, used by
+            the copy button while streaming
+        reset: Replace the message content instead of appending to it; the
+            raw delta is then the whole source
+        user_scrolled: Whether user has manually scrolled
+
+    Returns:
+        JavaScript code to evaluate in the page
+    """
+    return (
+        f"updateStreamingMessage({idx}, {dumps_str(stable_delta)}, {dumps_str(tail_html)}, "
+        f"{dumps_str(raw_delta)}, {str(reset).lower()}, {str(user_scrolled).lower()});"
+    )
+
+
+def generate_messages_update_js(messages_html: str, user_scrolled: bool) -> str:
+    """Build the JavaScript call that replaces all messages in a loaded page.
+
+    Used instead of reloading the document when the styles and scripts of the
+    loaded page are still current.
+
+    Args:
+        messages_html: HTML string containing all messages
+        user_scrolled: Whether user has manually scrolled
+
+    Returns:
+        JavaScript code to evaluate in the page
+    """
+    return f"replaceMessages({dumps_str(messages_html)}, {str(user_scrolled).lower()});"
+
+
+# Substrings that may start TeX math, which MathJax is needed for
+_MATH_MARKERS = ("$", "\\(", "\\[")
+
+_BODY_TAG = b'<body data-user-scrolled="false">\n    <div id="messages">'
+_BODY_TAG_SCROLLED = b'<body data-user-scrolled="true">\n    <div id="messages">'
+
+
+def generate_html_template(
+    messages_html: str, font_family: str, font_size: int, is_dark: bool, user_scrolled: bool
+) -> bytes:
+    """Generate complete HTML template for conversation display.
+
+    Args:
+        messages_html: HTML string containing all messages
+        font_family: Font family to use
+        font_size: Font size in pixels
+        is_dark: Whether dark mode is active
+        user_scrolled: Whether user has manually scrolled
+
+    Returns:
+        Complete HTML document, UTF-8 encoded
+    """
+    has_math = any(marker in messages_html for marker in _MATH_MARKERS)
+    head, suffix, styles_path = _build_shell(font_family, font_size, is_dark, has_math)
+    if styles_path is not None and not styles_path.exists():
+        # The cache directory was cleaned (or another theme's stylesheet
+        # replaced it); build the shell again so the file is rewritten
+        _build_shell.cache_clear()
+        head, suffix, styles_path = _build_shell(font_family, font_size, is_dark, has_math)
+    body_tag = _BODY_TAG_SCROLLED if user_scrolled else _BODY_TAG
+    return b"".join((head, body_tag, messages_html.encode(), suffix))
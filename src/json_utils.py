@@ -0,0 +1,61 @@
+"""JSON encoding and decoding helpers.
+
+orjson is used when it is installed: it parses and serializes in native code
+and works on bytes directly, which matters for the per-chunk parsing while
+streaming and for loading many conversation files. Without it the stdlib json
+module is used with the same results, apart from whitespace.
+"""
+
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # Optional speedup; fall back to the json module
+    orjson = None
+
+# orjson.JSONDecodeError subclasses json.JSONDecodeError, so callers catch the
+# stdlib exception regardless of the backend in use
+JSONDecodeError = json.JSONDecodeError
+
+
+if orjson is not None:
+    loads = orjson.loads
+
+    def dumps(obj: Any, pretty: bool = False) -> bytes:
+        """Serialize an object to UTF-8 encoded JSON.
+
+        Args:
+            obj: The object to serialize
+            pretty: Indent with two spaces, for files meant to be human-readable
+
+        Returns:
+            The encoded JSON
+        """
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if pretty else 0)
+
+    def dumps_str(obj: Any) -> str:
+        """Serialize an object to a JSON string (also a valid JS literal)."""
+        return orjson.dumps(obj).decode()
+
+else:
+
+    def loads(data: bytes | memoryview | str) -> Any:
+        """Parse JSON from bytes, a memoryview or a string."""
+        if isinstance(data, memoryview):
+            data = data.tobytes()
+        return json.loads(data)
+
+    def dumps(obj: Any, pretty: bool = False) -> bytes:
+        """Serialize an object to UTF-8 encoded JSON.
+
+        Args:
+            obj: The object to serialize
+            pretty: Indent with two spaces, for files meant to be human-readable
+
+        Returns:
+            The encoded JSON
+        """
+        return json.dumps(obj, indent=2 if pretty else None, ensure_ascii=False).encode()
+
+    dumps_str = json.dumps
@@ -8,6 +8,9 @@ from logging.handlers import RotatingFileHandler
 from datetime import datetime
 from typing import Optional
 
+# Only every Nth streamed chunk is logged, to avoid spam
+STREAM_LOG_INTERVAL = 10
+
 
 class PopupAILogger:
     """Centralized logger for Popup AI application."""
@@ -214,22 +217,24 @@ class PopupAILogger:
     def log_ai_stream_chunk(self, model: str, chunk_num: int, chunk_size: int, total_size: int):
         """Log streaming progress.
 
+        Callers sample the chunks, calling this every STREAM_LOG_INTERVAL
+        chunks, so the stream loop skips the call for the others.
+
         Args:
             model: Model name
             chunk_num: Chunk number
             chunk_size: Size of this chunk
             total_size: Total size so far
         """
-        if chunk_num % 10 == 0:  # Log every 10th chunk to avoid spam
-            log_entry = {
-                "type": "stream_progress",
-                "timestamp": datetime.now().isoformat(),
-                "model": model,
-                "chunk_num": chunk_num,
-                "chunk_size": chunk_size,
-                "total_size": total_size,
-            }
-            self.ai_logger.debug(self._format_log_entry(log_entry))
+        log_entry = {
+            "type": "stream_progress",
+            "timestamp": datetime.now().isoformat(),
+            "model": model,
+            "chunk_num": chunk_num,
+            "chunk_size": chunk_size,
+            "total_size": total_size,
+        }
+        self.ai_logger.debug(self._format_log_entry(log_entry))
 
     def _get_last_user_message(self, messages: list) -> Optional[str]:
         """Extract last user message from messages list.
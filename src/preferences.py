@@ -1,12 +1,12 @@
 """Preferences window for managing settings."""
 
-from typing import Optional
+from typing import Any, Callable, Optional
 import gi
 
 gi.require_version("Gtk", "4.0")
 gi.require_version("Adw", "1")
 
-from gi.repository import Gtk, Adw
+from gi.repository import Gtk, Adw, GLib, Pango
 
 from src.config import Settings, ModelConfig, PromptTemplate
 from src.logger import get_logger
@@ -28,8 +28,14 @@ from src.ui_strings import (
     PLACEHOLDER_DESCRIPTION,
 )
 from src.constants import (
+    DEFAULT_WEBVIEW_FONT_FAMILY,
+    DEFAULT_WEBVIEW_FONT_SIZE,
     MARGIN_MEDIUM,
     MARGIN_LARGE,
+    PREFERENCES_NOTIFY_DELAY_MS,
+    PREFERENCES_SAVE_DELAY_MS,
+    PROMPT_EDITOR_UNDO_LEVELS,
+    SPIN_COMMIT_DELAY_MS,
     SPACING_SMALL,
     SPACING_MEDIUM,
 )
@@ -37,6 +43,107 @@ from src.constants import (
 # Configure logging
 logger = get_logger(__name__)
 
+# Settings whose change requires refetching the model lists
+_REFETCH_KEYS = frozenset(
+    {
+        "ollama_endpoint",
+        "openai_endpoint",
+        "openai_api_key",
+        "perplexity_endpoint",
+        "perplexity_api_key",
+        "custom_api_endpoint",
+        "custom_api_key",
+    }
+)
+
+
+def _make_flat_icon_button(icon_name: str, tooltip: str) -> Gtk.Button:
+    """Create the flat icon button used for list row actions.
+
+    The properties are passed to the constructor, so the button is set up in
+    one call rather than one call per property.
+
+    Args:
+        icon_name: Icon to show
+        tooltip: Tooltip text
+
+    Returns:
+        The new button
+    """
+    return Gtk.Button(
+        icon_name=icon_name,
+        tooltip_text=tooltip,
+        valign=Gtk.Align.CENTER,
+        css_classes=["flat"],
+    )
+
+
+def _trim(text: str) -> str:
+    """Strip surrounding whitespace, without copying text that has none."""
+    if text and (text[0].isspace() or text[-1].isspace()):
+        return text.strip()
+    return text
+
+
+def _new_error_dialog(parent: Gtk.Window) -> Adw.MessageDialog:
+    """Create an error dialog that is hidden, not destroyed, when answered.
+
+    Args:
+        parent: Window the dialog belongs to
+
+    Returns:
+        The dialog, without a body; set it before presenting
+    """
+    dialog = Adw.MessageDialog.new(parent)
+    dialog.set_heading("Error")
+    dialog.add_response("ok", "OK")
+    dialog.set_hide_on_close(True)
+    return dialog
+
+
+def _heading(text: str, margin_top: int = 0) -> Gtk.Label:
+    """Create a start-aligned heading label for the prompt editor form.
+
+    Args:
+        text: Label text
+        margin_top: Space above the label in pixels
+
+    Returns:
+        The new label
+    """
+    return Gtk.Label(
+        label=text,
+        halign=Gtk.Align.START,
+        margin_top=margin_top,
+        css_classes=["heading"],
+    )
+
+
+# Dropdown model for choosing a prompt's default model: "(None)" followed by
+# the model names. Shared by all prompt editors and updated only when the
+# configured models change.
+_model_names: tuple[str, ...] = ()
+_model_string_list: Optional[Gtk.StringList] = None
+
+
+def _get_model_string_list(names: list[str]) -> Gtk.StringList:
+    """Get the shared model list, updated to the given model names.
+
+    Args:
+        names: Names of the configured models, in order
+
+    Returns:
+        A list of "(None)" followed by the names
+    """
+    global _model_names, _model_string_list
+    if _model_string_list is None:
+        _model_string_list = Gtk.StringList.new(["(None)"])
+    if tuple(names) != _model_names:
+        # Replace all names in one call
+        _model_string_list.splice(1, len(_model_names), names)
+        _model_names = tuple(names)
+    return _model_string_list
+
 
 class PreferencesWindow(Adw.PreferencesWindow):
     """Preferences window."""
@@ -47,28 +154,135 @@ class PreferencesWindow(Adw.PreferencesWindow):
         self.settings = settings
         self.on_settings_changed = on_settings_changed
         self.set_default_size(700, 600)
+        # Drops shadows and transitions, see style.css
+        self.add_css_class("popup-preferences")
 
-        # General Settings page
-        self.build_general_settings_page()
+        # Conversation font families, normalized once; saved after each edit
+        self._font_families: list[str] = self._load_font_families()
 
-        # API Settings page
-        self.build_api_settings_page()
+        # Whether a parent notification is queued on the main loop
+        self._settings_changed_pending = False
 
-        # Models page
-        self.build_models_page()
+        # Created by show_error on first use and reused afterwards
+        self._error_dialog: Optional[Adw.MessageDialog] = None
 
-        # Prompts page
-        self.build_prompts_page()
+        # Pending debounced callbacks: key -> GLib source id
+        self._debounce_sources: dict[str, int] = {}
 
-        # Appearance page
-        self.build_appearance_page()
+        # Edited values not yet handed to Settings, applied together
+        self._pending_settings: dict[str, Any] = {}
+        self._flush_scheduled = False
+        self.connect("close-request", self._on_close_request)
+        # Kept by the parent and shown again, see populate()
+        self.set_hide_on_close(True)
 
-    def build_api_settings_page(self):
+        # Pages are added empty and filled in by their builder when first shown,
+        # or from idle callbacks after the first page so search finds every row
+        self._page_builders: dict[Adw.PreferencesPage, Callable] = {}
+        self._add_lazy_page(
+            "General", "preferences-system-symbolic", self.build_general_settings_page
+        )
+        self._add_lazy_page("API Settings", "network-server-symbolic", self.build_api_settings_page)
+        self._add_lazy_page("Models", "applications-science-symbolic", self.build_models_page)
+        self._add_lazy_page("Prompts", "text-x-generic-symbolic", self.build_prompts_page)
+        self._add_lazy_page(
+            "Appearance", "applications-graphics-symbolic", self.build_appearance_page
+        )
+
+        self.connect("notify::visible-page", self._on_visible_page_changed)
+        self._build_page(self.get_visible_page())
+        GLib.idle_add(self._build_next_lazy_page, priority=GLib.PRIORITY_LOW)
+
+    def _load_font_families(self) -> list[str]:
+        """Read the conversation font families from settings.
+
+        Settings normalizes the stored value to a list without duplicates when
+        the file is loaded; this returns a copy for editing.
+        """
+        return list(self.settings.get("webview_font_families", ["Sans"]))
+
+    def populate(self):
+        """Reload the displayed values from settings.
+
+        The parent window creates this window once and, for later opens,
+        calls populate() before present(): closing only hides it. Values may
+        have changed while it was hidden (e.g. the window size or fetched
+        models). Pages that were never shown read settings when first built,
+        so only built pages are updated.
+        """
+        self._font_families = self._load_font_families()
+
+        if hasattr(self, "ollama_endpoint_row"):
+            self.ollama_endpoint_row.set_text(
+                self.settings.get("ollama_endpoint", "http://localhost:11434")
+            )
+            self.openai_endpoint_row.set_text(
+                self.settings.get("openai_endpoint", "https://api.openai.com")
+            )
+            self.openai_api_key_row.set_text(self.settings.get("openai_api_key", ""))
+            self.perplexity_endpoint_row.set_text(
+                self.settings.get("perplexity_endpoint", "https://api.perplexity.ai")
+            )
+            self.perplexity_api_key_row.set_text(self.settings.get("perplexity_api_key", ""))
+            self.custom_endpoint_row.set_text(self.settings.get("custom_api_endpoint", ""))
+            self.custom_api_key_row.set_text(self.settings.get("custom_api_key", ""))
+
+        if hasattr(self, "auto_fetch_row"):
+            self.auto_fetch_row.set_active(self.settings.get("auto_fetch_models", True))
+            self.width_row.set_value(self.settings.get("window_width", 800))
+            self.height_row.set_value(self.settings.get("window_height", 600))
+            self.input_height_row.set_value(self.settings.get("input_max_height", 150))
+            self.max_history_row.set_value(self.settings.get("max_history", 50))
+
+        if hasattr(self, "models_group"):
+            self.refresh_models_list()
+
+        if hasattr(self, "prompts_group"):
+            self.refresh_prompts_list()
+
+        if hasattr(self, "webview_fonts_group"):
+            self.ui_font_button.set_font(self.settings.get("ui_font_family", "Sans 11"))
+            self.webview_font_size_row.set_value(self.settings.get("webview_font_size", 14))
+            self.refresh_webview_fonts_list()
+
+    def _add_lazy_page(self, title: str, icon_name: str, builder: Callable):
+        """Add an empty page whose content is built on first display or idle.
+
+        Args:
+            title: Page title
+            icon_name: Page icon name
+            builder: Called with the page to add its groups
+        """
+        page = Adw.PreferencesPage()
+        page.set_title(title)
+        page.set_icon_name(icon_name)
+        self.add(page)
+        self._page_builders[page] = builder
+
+    def _build_page(self, page: Optional[Adw.PreferencesPage]):
+        """Build a page's content if it hasn't been built yet."""
+        builder = self._page_builders.pop(page, None)
+        if builder:
+            builder(page)
+
+    def _build_next_lazy_page(self) -> bool:
+        """Build one page not shown yet, one per idle callback.
+
+        Returns:
+            Whether pages remain to be built
+        """
+        page = next(iter(self._page_builders), None)
+        if page is None:
+            return GLib.SOURCE_REMOVE
+        self._build_page(page)
+        return GLib.SOURCE_CONTINUE if self._page_builders else GLib.SOURCE_REMOVE
+
+    def _on_visible_page_changed(self, window, param):
+        """Build the newly shown page on first display."""
+        self._build_page(self.get_visible_page())
+
+    def build_api_settings_page(self, api_page: Adw.PreferencesPage):
         """Build API settings page."""
-        api_page = Adw.PreferencesPage()
-        api_page.set_title("API Settings")
-        api_page.set_icon_name("network-server-symbolic")
-        self.add(api_page)
 
         # Ollama settings
         ollama_group = Adw.PreferencesGroup()
@@ -151,51 +365,57 @@ class PreferencesWindow(Adw.PreferencesWindow):
         self.custom_api_key_row.connect("changed", self.on_config_changed, "custom_api_key")
         custom_group.add(self.custom_api_key_row)
 
-    def build_models_page(self):
+    def build_models_page(self, models_page: Adw.PreferencesPage):
         """Build models page."""
-        models_page = Adw.PreferencesPage()
-        models_page.set_title("Models")
-        models_page.set_icon_name("applications-science-symbolic")
-        self.add(models_page)
 
         self.models_group = Adw.PreferencesGroup()
         self.models_group.set_title("AI Models")
         self.models_group.set_description("Configured AI models")
         models_page.add(self.models_group)
 
+        # Dictionary to track model rows
+        self.model_rows: dict[str, Adw.ActionRow] = {}
+
         self.refresh_models_list()
 
     def refresh_models_list(self):
         """Refresh the models list display."""
-        # Clear existing rows
-        child = self.models_group.get_first_child()
-        while child:
-            next_child = child.get_next_sibling()
-            self.models_group.remove(child)
-            child = next_child
-
-        # Add model rows
-        for model in self.settings.models:
-            model_row = Adw.ActionRow()
-            model_row.set_title(model.name)
-            model_row.set_subtitle(f"{model.type}: {model.model_id}")
-
-            # Delete button
-            delete_btn = Gtk.Button()
-            delete_btn.set_icon_name("user-trash-symbolic")
-            delete_btn.set_valign(Gtk.Align.CENTER)
-            delete_btn.add_css_class("flat")
-            delete_btn.connect("clicked", self.on_delete_model, model.name)
-            model_row.add_suffix(delete_btn)
-
-            self.models_group.add(model_row)
-
-    def build_general_settings_page(self):
+        current_models = {m.name: m for m in self.settings.models}
+
+        # Remove deleted models
+        for name in self.model_rows.keys() - current_models.keys():
+            row = self.model_rows.pop(name)
+            self.models_group.remove(row)
+
+        # Add or update models
+        for model in current_models.values():
+            subtitle = f"{model.type}: {model.model_id}"
+            row = self.model_rows.get(model.name)
+            if row is not None:
+                # Update existing row
+                if row.get_subtitle() != subtitle:
+                    row.set_subtitle(subtitle)
+            else:
+                # Create new row
+                row = self._create_model_row(model, subtitle)
+                self.model_rows[model.name] = row
+                self.models_group.add(row)
+
+    def _create_model_row(self, model: ModelConfig, subtitle: str):
+        """Create a new model row widget."""
+        model_row = Adw.ActionRow()
+        model_row.set_title(model.name)
+        model_row.set_subtitle(subtitle)
+
+        # Delete button
+        delete_btn = _make_flat_icon_button("user-trash-symbolic", "Delete Model")
+        delete_btn.connect("clicked", self.on_delete_model, model.name)
+        model_row.add_suffix(delete_btn)
+
+        return model_row
+
+    def build_general_settings_page(self, general_page: Adw.PreferencesPage):
         """Build general settings page."""
-        general_page = Adw.PreferencesPage()
-        general_page.set_title("General")
-        general_page.set_icon_name("preferences-system-symbolic")
-        self.add(general_page)
 
         # Model settings
         model_group = Adw.PreferencesGroup()
@@ -203,12 +423,12 @@ class PreferencesWindow(Adw.PreferencesWindow):
         general_page.add(model_group)
 
         # Auto-fetch models
-        auto_fetch_row = Adw.SwitchRow()
-        auto_fetch_row.set_title("Auto-fetch Models")
-        auto_fetch_row.set_subtitle("Automatically fetch available models on startup")
-        auto_fetch_row.set_active(self.settings.get("auto_fetch_models", True))
-        auto_fetch_row.connect("notify::active", self.on_auto_fetch_changed)
-        model_group.add(auto_fetch_row)
+        self.auto_fetch_row = Adw.SwitchRow()
+        self.auto_fetch_row.set_title("Auto-fetch Models")
+        self.auto_fetch_row.set_subtitle("Automatically fetch available models on startup")
+        self.auto_fetch_row.set_active(self.settings.get("auto_fetch_models", True))
+        self.auto_fetch_row.connect("notify::active", self.on_auto_fetch_changed)
+        model_group.add(self.auto_fetch_row)
 
         # Window settings
         window_group = Adw.PreferencesGroup()
@@ -217,28 +437,28 @@ class PreferencesWindow(Adw.PreferencesWindow):
         general_page.add(window_group)
 
         # Default window width
-        width_row = Adw.SpinRow.new_with_range(400, 2000, 50)
-        width_row.set_title("Default Width")
-        width_row.set_subtitle("Window width in pixels")
-        width_row.set_value(self.settings.get("window_width", 800))
-        width_row.connect("changed", self.on_window_width_changed)
-        window_group.add(width_row)
+        self.width_row = Adw.SpinRow.new_with_range(400, 2000, 50)
+        self.width_row.set_title("Default Width")
+        self.width_row.set_subtitle("Window width in pixels")
+        self.width_row.set_value(self.settings.get("window_width", 800))
+        self.width_row.connect("changed", self.on_window_width_changed)
+        window_group.add(self.width_row)
 
         # Default window height
-        height_row = Adw.SpinRow.new_with_range(300, 1500, 50)
-        height_row.set_title("Default Height")
-        height_row.set_subtitle("Window height in pixels")
-        height_row.set_value(self.settings.get("window_height", 600))
-        height_row.connect("changed", self.on_window_height_changed)
-        window_group.add(height_row)
+        self.height_row = Adw.SpinRow.new_with_range(300, 1500, 50)
+        self.height_row.set_title("Default Height")
+        self.height_row.set_subtitle("Window height in pixels")
+        self.height_row.set_value(self.settings.get("window_height", 600))
+        self.height_row.connect("changed", self.on_window_height_changed)
+        window_group.add(self.height_row)
 
         # Input max height
-        input_height_row = Adw.SpinRow.new_with_range(50, 500, 10)
-        input_height_row.set_title("Input Max Height")
-        input_height_row.set_subtitle("Maximum height of input area in pixels")
-        input_height_row.set_value(self.settings.get("input_max_height", 150))
-        input_height_row.connect("changed", self.on_input_height_changed)
-        window_group.add(input_height_row)
+        self.input_height_row = Adw.SpinRow.new_with_range(50, 500, 10)
+        self.input_height_row.set_title("Input Max Height")
+        self.input_height_row.set_subtitle("Maximum height of input area in pixels")
+        self.input_height_row.set_value(self.settings.get("input_max_height", 150))
+        self.input_height_row.connect("changed", self.on_input_height_changed)
+        window_group.add(self.input_height_row)
 
         # History settings
         history_group = Adw.PreferencesGroup()
@@ -247,19 +467,15 @@ class PreferencesWindow(Adw.PreferencesWindow):
         general_page.add(history_group)
 
         # Max history
-        max_history_row = Adw.SpinRow.new_with_range(10, 200, 10)
-        max_history_row.set_title("Maximum Conversations")
-        max_history_row.set_subtitle("Maximum number of conversations to keep")
-        max_history_row.set_value(self.settings.get("max_history", 50))
-        max_history_row.connect("changed", self.on_max_history_changed)
-        history_group.add(max_history_row)
-
-    def build_appearance_page(self):
+        self.max_history_row = Adw.SpinRow.new_with_range(10, 200, 10)
+        self.max_history_row.set_title("Maximum Conversations")
+        self.max_history_row.set_subtitle("Maximum number of conversations to keep")
+        self.max_history_row.set_value(self.settings.get("max_history", 50))
+        self.max_history_row.connect("changed", self.on_max_history_changed)
+        history_group.add(self.max_history_row)
+
+    def build_appearance_page(self, appearance_page: Adw.PreferencesPage):
         """Build appearance settings page."""
-        appearance_page = Adw.PreferencesPage()
-        appearance_page.set_title("Appearance")
-        appearance_page.set_icon_name("applications-graphics-symbolic")
-        self.add(appearance_page)
 
         # UI Font settings
         ui_font_group = Adw.PreferencesGroup()
@@ -326,8 +542,10 @@ class PreferencesWindow(Adw.PreferencesWindow):
         add_font_row.add_suffix(add_font_btn)
         self.webview_fonts_group.add(add_font_row)
 
-        # Track font rows
-        self.webview_font_rows = []
+        # Track font rows by family, with their move buttons and shown order
+        self.webview_font_rows: dict[str, Adw.ActionRow] = {}
+        self._font_row_buttons: dict[str, tuple[Gtk.Button, Gtk.Button]] = {}
+        self._font_row_state: list[str] = []
         self.refresh_webview_fonts_list()
 
         # Reset buttons
@@ -353,22 +571,126 @@ class PreferencesWindow(Adw.PreferencesWindow):
         reset_webview_row.add_suffix(reset_webview_btn)
         reset_group.add(reset_webview_row)
 
+    def _queue_settings_changed(self):
+        """Notify the parent window once the current burst of changes is done.
+
+        Several edits handled in one main loop iteration (e.g. a reset that
+        changes two settings) lead to a single notification.
+        """
+        if not self.on_settings_changed or self._settings_changed_pending:
+            return
+        self._settings_changed_pending = True
+        GLib.idle_add(self._flush_settings_changed)
+
+    def _flush_settings_changed(self):
+        """Deliver the queued parent notification (idle callback)."""
+        self._settings_changed_pending = False
+        # The parent reads the new values from Settings
+        self._flush_settings()
+        self.on_settings_changed()
+        return GLib.SOURCE_REMOVE
+
+    def _queue_setting(self, key: str, value: Any):
+        """Stage a setting; staged values are applied together shortly after.
+
+        Args:
+            key: Configuration key
+            value: New value
+        """
+        self._pending_settings[key] = value
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            GLib.timeout_add(PREFERENCES_SAVE_DELAY_MS, self._on_flush_timeout)
+
+    def _commit(self, key: str, value: Any, notify: bool = False) -> bool:
+        """Stage a setting only if it differs from the current value.
+
+        Widgets can report a change without one (e.g. a font chooser
+        confirming the same font), which would otherwise make the parent
+        redraw or refetch for nothing.
+
+        Args:
+            key: Configuration key
+            value: New value
+            notify: Whether to notify the parent window if the value changed
+
+        Returns:
+            Whether the value changed
+        """
+        current = self._pending_settings.get(key, self.settings.get(key))
+        if current == value:
+            return False
+        self._queue_setting(key, value)
+        if notify:
+            self._queue_settings_changed()
+        return True
+
+    def _on_flush_timeout(self):
+        """Apply staged settings (timeout callback)."""
+        self._flush_scheduled = False
+        self._flush_settings()
+        return GLib.SOURCE_REMOVE
+
+    def _flush_settings(self):
+        """Apply all staged settings in one Settings.update call."""
+        if self._pending_settings:
+            pending, self._pending_settings = self._pending_settings, {}
+            self.settings.update(pending)
+
+    def _on_close_request(self, window):
+        """Apply staged settings before the window goes away."""
+        self._flush_settings()
+        return False
+
+    def _debounce(self, key: str, fn: Callable, delay_ms: int = PREFERENCES_NOTIFY_DELAY_MS):
+        """Run fn once no call with the same key has happened for delay_ms.
+
+        Args:
+            key: Identifies the calls to coalesce
+            fn: Callback taking no arguments
+            delay_ms: Quiet period in milliseconds
+        """
+        source_id = self._debounce_sources.pop(key, None)
+        if source_id is not None:
+            GLib.source_remove(source_id)
+
+        def on_timeout():
+            del self._debounce_sources[key]
+            fn()
+            return GLib.SOURCE_REMOVE
+
+        # Idle priority, so the callback waits for pending input and redraws
+        self._debounce_sources[key] = GLib.timeout_add(
+            delay_ms, on_timeout, priority=GLib.PRIORITY_DEFAULT_IDLE
+        )
+
+    def _commit_spin_value(self, spin_row, config_key: str, notify: bool = False):
+        """Save a spin row's value once it stops changing.
+
+        Holding an arrow emits a change per step; only the final value is
+        saved and announced.
+
+        Args:
+            spin_row: The spin row that changed
+            config_key: Setting to store the value in
+            notify: Whether to notify the parent window afterwards
+        """
+
+        def commit():
+            self._commit(config_key, int(spin_row.get_value()), notify)
+
+        self._debounce(config_key, commit, SPIN_COMMIT_DELAY_MS)
+
     def on_config_changed(self, entry, config_key):
         """Handle configuration change."""
+        # Staged and applied with other edits; Settings coalesces the file write
         value = entry.get_text()
-        self.settings.set(config_key, value)
-
-        # Trigger model refetch in parent window
-        if self.on_settings_changed and config_key in [
-            "ollama_endpoint",
-            "openai_endpoint",
-            "openai_api_key",
-            "perplexity_endpoint",
-            "perplexity_api_key",
-            "custom_api_endpoint",
-            "custom_api_key",
-        ]:
-            self.on_settings_changed()
+        changed = self._commit(config_key, value)
+
+        # Trigger model refetch in parent window once typing pauses, rather
+        # than for every keystroke
+        if changed and config_key in _REFETCH_KEYS:
+            self._debounce(config_key, self._queue_settings_changed)
 
     def on_delete_model(self, button, model_name):
         """Handle model deletion."""
@@ -376,38 +698,31 @@ class PreferencesWindow(Adw.PreferencesWindow):
         self.refresh_models_list()
 
         # Notify parent window
-        if self.on_settings_changed:
-            self.on_settings_changed()
+        self._queue_settings_changed()
 
     def on_auto_fetch_changed(self, switch_row, param):
         """Handle auto-fetch models toggle."""
-        self.settings.set("auto_fetch_models", switch_row.get_active())
+        self._commit("auto_fetch_models", switch_row.get_active())
 
     def on_window_width_changed(self, spin_row):
         """Handle window width change."""
-        self.settings.set("window_width", int(spin_row.get_value()))
+        self._commit_spin_value(spin_row, "window_width")
 
     def on_window_height_changed(self, spin_row):
         """Handle window height change."""
-        self.settings.set("window_height", int(spin_row.get_value()))
+        self._commit_spin_value(spin_row, "window_height")
 
     def on_input_height_changed(self, spin_row):
         """Handle input max height change."""
-        self.settings.set("input_max_height", int(spin_row.get_value()))
         # Notify parent to update UI
-        if self.on_settings_changed:
-            self.on_settings_changed()
+        self._commit_spin_value(spin_row, "input_max_height", notify=True)
 
     def on_max_history_changed(self, spin_row):
         """Handle max history change."""
-        self.settings.set("max_history", int(spin_row.get_value()))
+        self._commit_spin_value(spin_row, "max_history")
 
-    def build_prompts_page(self):
+    def build_prompts_page(self, prompts_page: Adw.PreferencesPage):
         """Build prompts management page."""
-        prompts_page = Adw.PreferencesPage()
-        prompts_page.set_title("Prompts")
-        prompts_page.set_icon_name("text-x-generic-symbolic")
-        self.add(prompts_page)
 
         self.prompts_group = Adw.PreferencesGroup()
         self.prompts_group.set_title("Prompt Templates")
@@ -476,20 +791,12 @@ class PreferencesWindow(Adw.PreferencesWindow):
             prompt_row.set_subtitle(" | ".join(subtitle_parts))
 
         # Edit button
-        edit_btn = Gtk.Button()
-        edit_btn.set_icon_name("document-edit-symbolic")
-        edit_btn.set_valign(Gtk.Align.CENTER)
-        edit_btn.add_css_class("flat")
-        edit_btn.set_tooltip_text("Edit Prompt")
+        edit_btn = _make_flat_icon_button("document-edit-symbolic", "Edit Prompt")
         edit_btn.connect("clicked", self.on_edit_prompt, prompt.name)
         prompt_row.add_suffix(edit_btn)
 
         # Delete button
-        delete_btn = Gtk.Button()
-        delete_btn.set_icon_name("user-trash-symbolic")
-        delete_btn.set_valign(Gtk.Align.CENTER)
-        delete_btn.add_css_class("flat")
-        delete_btn.set_tooltip_text("Delete Prompt")
+        delete_btn = _make_flat_icon_button("user-trash-symbolic", "Delete Prompt")
         delete_btn.connect("clicked", self.on_delete_prompt, prompt.name)
         prompt_row.add_suffix(delete_btn)
 
@@ -500,8 +807,7 @@ class PreferencesWindow(Adw.PreferencesWindow):
 
         def on_save():
             self.refresh_prompts_list()
-            if self.on_settings_changed:
-                self.on_settings_changed()
+            self._queue_settings_changed()
 
         dialog = PromptEditDialog(self, self.settings, None, on_save_callback=on_save)
         dialog.present()
@@ -513,8 +819,7 @@ class PreferencesWindow(Adw.PreferencesWindow):
 
             def on_save():
                 self.refresh_prompts_list()
-                if self.on_settings_changed:
-                    self.on_settings_changed()
+                self._queue_settings_changed()
 
             dialog = PromptEditDialog(self, self.settings, prompt, on_save_callback=on_save)
             dialog.present()
@@ -525,6 +830,8 @@ class PreferencesWindow(Adw.PreferencesWindow):
         dialog = Adw.MessageDialog.new(self)
         dialog.set_heading(DIALOG_DELETE_PROMPT_TITLE)
         dialog.set_body(DIALOG_DELETE_PROMPT_BODY.format(name=prompt_name))
+        # Skip the open/close transitions, see style.css
+        dialog.add_css_class("no-anim")
         dialog.add_response("cancel", "Cancel")
         dialog.add_response("delete", "Delete")
         dialog.set_response_appearance("delete", Adw.ResponseAppearance.DESTRUCTIVE)
@@ -536,8 +843,7 @@ class PreferencesWindow(Adw.PreferencesWindow):
                 self.settings.remove_prompt(prompt_name)
                 self.refresh_prompts_list()
                 # Notify parent to update UI
-                if self.on_settings_changed:
-                    self.on_settings_changed()
+                self._queue_settings_changed()
 
         dialog.connect("response", on_response)
         dialog.present()
@@ -545,79 +851,89 @@ class PreferencesWindow(Adw.PreferencesWindow):
     def on_ui_font_changed(self, font_button):
         """Handle UI font change."""
         font = font_button.get_font()
-        self.settings.set("ui_font_family", font)
-
         # Notify parent to update UI
-        if self.on_settings_changed:
-            self.on_settings_changed()
+        self._commit("ui_font_family", font, notify=True)
 
     def on_webview_font_size_changed(self, spin_row):
         """Handle webview font size change."""
-        font_size = int(spin_row.get_value())
-        self.settings.set("webview_font_size", font_size)
-
         # Notify parent to update UI
-        if self.on_settings_changed:
-            self.on_settings_changed()
+        self._commit_spin_value(spin_row, "webview_font_size", notify=True)
 
     def refresh_webview_fonts_list(self):
         """Refresh the webview fonts list display."""
-        # Clear existing font rows (except the add button)
-        for row in self.webview_font_rows:
-            self.webview_fonts_group.remove(row)
-        self.webview_font_rows.clear()
-
-        # Get current font families
-        font_families = self.settings.get("webview_font_families", ["Sans"])
-        if not isinstance(font_families, list):
-            font_families = [str(font_families)]
-
-        # Add font rows
+        font_families = self._font_families
+        rows = self.webview_font_rows
+
+        # Remove rows of fonts that are gone
+        for font_family in rows.keys() - set(font_families):
+            self.webview_fonts_group.remove(rows.pop(font_family))
+            del self._font_row_buttons[font_family]
+        shown = [f for f in self._font_row_state if f in rows]
+
+        # Rows before the first position that changed stay in place; the rest
+        # are re-added in the new order, reusing the existing widgets
+        first_changed = min(len(shown), len(font_families))
+        for idx, (old, new) in enumerate(zip(shown, font_families)):
+            if old != new:
+                first_changed = idx
+                break
+        for font_family in shown[first_changed:]:
+            self.webview_fonts_group.remove(rows[font_family])
+        for font_family in font_families[first_changed:]:
+            row = rows.get(font_family)
+            if row is None:
+                row = self._create_webview_font_row(font_family)
+                rows[font_family] = row
+            self.webview_fonts_group.add(row)
+        self._font_row_state = list(font_families)
+
+        # Update the position-dependent subtitle and buttons in place
+        last_idx = len(font_families) - 1
         for idx, font_family in enumerate(font_families):
-            font_row = self._create_webview_font_row(font_family, idx, len(font_families))
-            self.webview_font_rows.append(font_row)
-            self.webview_fonts_group.add(font_row)
+            row = rows[font_family]
+            subtitle = "Primary font" if idx == 0 else f"Fallback {idx}"
+            if row.get_subtitle() != subtitle:
+                row.set_subtitle(subtitle)
+            up_btn, down_btn = self._font_row_buttons[font_family]
+            up_btn.set_visible(idx > 0)
+            down_btn.set_visible(idx < last_idx)
+
+    def _save_font_families(self):
+        """Store the edited font families and update their rows."""
+        # A copy, so later edits don't change the stored value before it's saved
+        self._queue_setting("webview_font_families", list(self._font_families))
+        self.refresh_webview_fonts_list()
+
+    def _create_webview_font_row(self, font_family: str):
+        """Create a font row widget.
 
-    def _create_webview_font_row(self, font_family: str, index: int, total: int):
-        """Create a font row widget."""
+        The subtitle and the visibility of the move buttons depend on the
+        row's position and are set by refresh_webview_fonts_list.
+        """
         font_row = Adw.ActionRow()
         font_row.set_title(font_family)
-        if index == 0:
-            font_row.set_subtitle("Primary font")
-        else:
-            font_row.set_subtitle(f"Fallback {index}")
 
         # Button box for controls
         button_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=4)
         button_box.set_valign(Gtk.Align.CENTER)
 
         # Move up button
-        if index > 0:
-            up_btn = Gtk.Button()
-            up_btn.set_icon_name("go-up-symbolic")
-            up_btn.add_css_class("flat")
-            up_btn.set_tooltip_text("Move Up")
-            up_btn.connect("clicked", self.on_move_font_up, index)
-            button_box.append(up_btn)
+        up_btn = _make_flat_icon_button("go-up-symbolic", "Move Up")
+        up_btn.connect("clicked", self.on_move_font_up, font_family)
+        button_box.append(up_btn)
 
         # Move down button
-        if index < total - 1:
-            down_btn = Gtk.Button()
-            down_btn.set_icon_name("go-down-symbolic")
-            down_btn.add_css_class("flat")
-            down_btn.set_tooltip_text("Move Down")
-            down_btn.connect("clicked", self.on_move_font_down, index)
-            button_box.append(down_btn)
+        down_btn = _make_flat_icon_button("go-down-symbolic", "Move Down")
+        down_btn.connect("clicked", self.on_move_font_down, font_family)
+        button_box.append(down_btn)
 
         # Delete button
-        delete_btn = Gtk.Button()
-        delete_btn.set_icon_name("user-trash-symbolic")
-        delete_btn.add_css_class("flat")
-        delete_btn.set_tooltip_text("Remove Font")
-        delete_btn.connect("clicked", self.on_remove_webview_font, index)
+        delete_btn = _make_flat_icon_button("user-trash-symbolic", "Remove Font")
+        delete_btn.connect("clicked", self.on_remove_webview_font, font_family)
         button_box.append(delete_btn)
 
         font_row.add_suffix(button_box)
+        self._font_row_buttons[font_family] = (up_btn, down_btn)
         return font_row
 
     def on_add_webview_font(self, button):
@@ -631,30 +947,23 @@ class PreferencesWindow(Adw.PreferencesWindow):
                 if font_description:
                     font_family = font_description.get_family()
 
-                    # Get current fonts
-                    font_families = self.settings.get("webview_font_families", ["Sans"])
-                    if not isinstance(font_families, list):
-                        font_families = [str(font_families)]
-
-                    # Add new font if not already in list
-                    if font_family not in font_families:
-                        font_families.append(font_family)
-                        self.settings.set("webview_font_families", font_families)
-                        self.refresh_webview_fonts_list()
+                    # Add new font if not already in list; the rows are keyed
+                    # by family, so this is a dict lookup
+                    if font_family not in self.webview_font_rows:
+                        self._font_families.append(font_family)
+                        self._save_font_families()
 
                         # Notify parent to update UI
-                        if self.on_settings_changed:
-                            self.on_settings_changed()
+                        self._queue_settings_changed()
             dialog.destroy()
 
         dialog.connect("response", on_response)
         dialog.show()
 
-    def on_remove_webview_font(self, button, index: int):
+    def on_remove_webview_font(self, button, font_family: str):
         """Handle removing a webview font."""
-        font_families = self.settings.get("webview_font_families", ["Sans"])
-        if not isinstance(font_families, list):
-            font_families = [str(font_families)]
+        font_families = self._font_families
+        index = font_families.index(font_family)
 
         # Don't allow removing the last font
         if len(font_families) <= 1:
@@ -664,106 +973,76 @@ class PreferencesWindow(Adw.PreferencesWindow):
         # Remove font at index
         if 0 <= index < len(font_families):
             font_families.pop(index)
-            self.settings.set("webview_font_families", font_families)
-            self.refresh_webview_fonts_list()
+            self._save_font_families()
 
             # Notify parent to update UI
-            if self.on_settings_changed:
-                self.on_settings_changed()
+            self._queue_settings_changed()
 
-    def on_move_font_up(self, button, index: int):
+    def on_move_font_up(self, button, font_family: str):
         """Handle moving a font up in priority."""
-        if index <= 0:
-            return
-
-        font_families = self.settings.get("webview_font_families", ["Sans"])
-        if not isinstance(font_families, list):
-            font_families = [str(font_families)]
-
-        # Swap with previous
-        font_families[index], font_families[index - 1] = (
-            font_families[index - 1],
-            font_families[index],
-        )
-        self.settings.set("webview_font_families", font_families)
-        self.refresh_webview_fonts_list()
-
-        # Notify parent to update UI
-        if self.on_settings_changed:
-            self.on_settings_changed()
+        self._move_font(font_family, -1)
 
-    def on_move_font_down(self, button, index: int):
+    def on_move_font_down(self, button, font_family: str):
         """Handle moving a font down in priority."""
-        font_families = self.settings.get("webview_font_families", ["Sans"])
-        if not isinstance(font_families, list):
-            font_families = [str(font_families)]
-
-        if index >= len(font_families) - 1:
+        self._move_font(font_family, 1)
+
+    def _move_font(self, font_family: str, offset: int):
+        """Swap a font with its neighbour in the cached list.
+
+        Args:
+            font_family: Font to move
+            offset: -1 to move up, 1 to move down
+        """
+        font_families = self._font_families
+        index = font_families.index(font_family)
+        other = index + offset
+        if not 0 <= other < len(font_families):
             return
 
-        # Swap with next
-        font_families[index], font_families[index + 1] = (
-            font_families[index + 1],
-            font_families[index],
-        )
-        self.settings.set("webview_font_families", font_families)
-        self.refresh_webview_fonts_list()
+        font_families[index], font_families[other] = font_families[other], font_families[index]
+        # Only the rows from the upper of the two positions are re-added
+        self._save_font_families()
 
         # Notify parent to update UI
-        if self.on_settings_changed:
-            self.on_settings_changed()
+        self._queue_settings_changed()
 
     def on_webview_font_changed(self, font_button):
         """Handle webview font change (legacy method for migration)."""
-        font = font_button.get_font()
-        # Parse font string to extract family and size
-        # Font string format: "Family Name Size"
-        parts = font.rsplit(" ", 1)
-        if len(parts) == 2:
-            font_family = parts[0]
-            try:
-                font_size = int(parts[1])
-            except ValueError:
-                font_size = 14
-        else:
-            font_family = font
-            font_size = 14
-
-        self.settings.set("webview_font_families", [font_family])
-        self.settings.set("webview_font_size", font_size)
+        # Pango separates family, style and size, which splitting the font
+        # string can't do for names like "DejaVu Sans Bold 14"
+        font_desc = font_button.get_font_desc() or Pango.FontDescription.from_string(
+            font_button.get_font()
+        )
+        font_family = font_desc.get_family() or DEFAULT_WEBVIEW_FONT_FAMILY
+        font_size = font_desc.get_size() // Pango.SCALE or DEFAULT_WEBVIEW_FONT_SIZE
 
+        self._font_families = [font_family]
         # Notify parent to update UI
-        if self.on_settings_changed:
-            self.on_settings_changed()
+        self._commit("webview_font_families", [font_family], notify=True)
+        self._commit("webview_font_size", font_size, notify=True)
 
     def on_reset_ui_font(self, button):
         """Reset UI font to default."""
         default_font = "Sans 11"
-        self.settings.set("ui_font_family", default_font)
         self.ui_font_button.set_font(default_font)
-
         # Notify parent to update UI
-        if self.on_settings_changed:
-            self.on_settings_changed()
+        self._commit("ui_font_family", default_font, notify=True)
 
     def on_reset_webview_font(self, button):
         """Reset webview font to default."""
-        self.settings.set("webview_font_families", ["Sans"])
-        self.settings.set("webview_font_size", 14)
-        self.webview_font_size_row.set_value(14)
+        self._font_families = ["Sans"]
         self.refresh_webview_fonts_list()
-
+        self.webview_font_size_row.set_value(14)
         # Notify parent to update UI
-        if self.on_settings_changed:
-            self.on_settings_changed()
+        self._commit("webview_font_families", ["Sans"], notify=True)
+        self._commit("webview_font_size", 14, notify=True)
 
     def show_error(self, message: str):
         """Show an error dialog."""
-        dialog = Adw.MessageDialog.new(self)
-        dialog.set_heading("Error")
-        dialog.set_body(message)
-        dialog.add_response("ok", "OK")
-        dialog.present()
+        if self._error_dialog is None:
+            self._error_dialog = _new_error_dialog(self)
+        self._error_dialog.set_body(message)
+        self._error_dialog.present()
 
 
 class PromptEditDialog(Adw.Window):
@@ -782,10 +1061,35 @@ class PromptEditDialog(Adw.Window):
         self.prompt = prompt
         self.is_edit = prompt is not None
         self.on_save_callback = on_save_callback
+        self._error_dialog: Optional[Adw.MessageDialog] = None  # See show_error
 
         self.set_title(EDIT_PROMPT_TITLE if self.is_edit else NEW_PROMPT_TITLE)
         self.set_default_size(500, 550)
 
+        # The form is added in a later main loop iteration, so the window can
+        # be shown before the text view and model list are set up
+        self._build_shell()
+        GLib.idle_add(self._build_body, priority=GLib.PRIORITY_DEFAULT_IDLE)
+
+        # Escape cancels and Ctrl+Enter saves; GTK matches the keys and only
+        # calls into Python when one of them is pressed
+        shortcuts = Gtk.ShortcutController()
+        shortcuts.add_shortcut(
+            Gtk.Shortcut.new(
+                Gtk.ShortcutTrigger.parse_string("Escape"),
+                Gtk.CallbackAction.new(self._on_cancel_shortcut),
+            )
+        )
+        shortcuts.add_shortcut(
+            Gtk.Shortcut.new(
+                Gtk.ShortcutTrigger.parse_string("<Control>Return"),
+                Gtk.CallbackAction.new(self._on_save_shortcut),
+            )
+        )
+        self.add_controller(shortcuts)
+
+    def _build_shell(self):
+        """Build the header bar and the empty scrolled content area."""
         # Main box
         main_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL)
         self.set_content(main_box)
@@ -806,128 +1110,139 @@ class PromptEditDialog(Adw.Window):
         header.pack_end(save_btn)
 
         # Scrolled window for content
-        scrolled = Gtk.ScrolledWindow()
-        scrolled.set_vexpand(True)
-        scrolled.set_policy(Gtk.PolicyType.NEVER, Gtk.PolicyType.AUTOMATIC)
+        scrolled = Gtk.ScrolledWindow(
+            vexpand=True,
+            hscrollbar_policy=Gtk.PolicyType.NEVER,
+            vscrollbar_policy=Gtk.PolicyType.AUTOMATIC,
+        )
         main_box.append(scrolled)
 
-        # Content box
-        content_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL)
-        content_box.set_margin_start(MARGIN_LARGE)
-        content_box.set_margin_end(MARGIN_LARGE)
-        content_box.set_margin_top(MARGIN_LARGE)
-        content_box.set_margin_bottom(MARGIN_LARGE)
-        content_box.set_spacing(SPACING_MEDIUM)
+        # Content box; properties set at construction rather than one by one
+        content_box = Gtk.Box(
+            orientation=Gtk.Orientation.VERTICAL,
+            margin_start=MARGIN_LARGE,
+            margin_end=MARGIN_LARGE,
+            margin_top=MARGIN_LARGE,
+            margin_bottom=MARGIN_LARGE,
+            spacing=SPACING_MEDIUM,
+        )
         scrolled.set_child(content_box)
+        self._content_box = content_box
+
+    def _build_body(self):
+        """Build the form fields (idle callback)."""
+        content_box = self._content_box
+        prompt = self.prompt
+        settings = self.settings
 
         # Name entry
-        name_label = Gtk.Label(label=LABEL_NAME)
-        name_label.set_halign(Gtk.Align.START)
-        name_label.add_css_class("heading")
-        content_box.append(name_label)
+        content_box.append(_heading(LABEL_NAME))
 
-        self.name_entry = Gtk.Entry()
-        self.name_entry.set_placeholder_text(PLACEHOLDER_PROMPT_NAME)
-        if prompt:
-            self.name_entry.set_text(prompt.name)
+        self.name_entry = Gtk.Entry(
+            placeholder_text=PLACEHOLDER_PROMPT_NAME, text=prompt.name if prompt else ""
+        )
         content_box.append(self.name_entry)
 
         # Description entry
-        desc_label = Gtk.Label(label=LABEL_DESCRIPTION)
-        desc_label.set_halign(Gtk.Align.START)
-        desc_label.add_css_class("heading")
-        desc_label.set_margin_top(MARGIN_MEDIUM)
-        content_box.append(desc_label)
-
-        self.desc_entry = Gtk.Entry()
-        self.desc_entry.set_placeholder_text(PLACEHOLDER_DESCRIPTION)
-        if prompt and prompt.description:
-            self.desc_entry.set_text(prompt.description)
+        content_box.append(_heading(LABEL_DESCRIPTION, MARGIN_MEDIUM))
+
+        self.desc_entry = Gtk.Entry(
+            placeholder_text=PLACEHOLDER_DESCRIPTION,
+            text=(prompt.description if prompt else None) or "",
+        )
         content_box.append(self.desc_entry)
 
         # Default model dropdown
-        model_label = Gtk.Label(label=LABEL_DEFAULT_MODEL)
-        model_label.set_halign(Gtk.Align.START)
-        model_label.add_css_class("heading")
-        model_label.set_margin_top(MARGIN_MEDIUM)
-        content_box.append(model_label)
-
-        model_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL)
-        model_box.set_spacing(SPACING_SMALL)
+        content_box.append(_heading(LABEL_DEFAULT_MODEL, MARGIN_MEDIUM))
+
+        model_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=SPACING_SMALL)
         content_box.append(model_box)
 
-        self.model_dropdown = Gtk.DropDown()
-        self.model_dropdown.set_hexpand(True)
+        self.model_dropdown = Gtk.DropDown(hexpand=True)
 
-        # Create model list with "None" option
-        model_list = Gtk.StringList()
-        model_list.append("(None)")
+        # Model list with "None" option
+        names = [model.name for model in settings.models]
+        model_list = _get_model_string_list(names)
 
         selected_idx = 0
-        if prompt and prompt.default_model:
-            for i, model in enumerate(settings.models):
-                model_list.append(model.name)
-                if model.name == prompt.default_model:
-                    selected_idx = i + 1  # +1 because of "(None)" option
-        else:
-            for model in settings.models:
-                model_list.append(model.name)
+        if prompt and prompt.default_model in names:
+            selected_idx = names.index(prompt.default_model) + 1  # +1 for "(None)"
 
         self.model_dropdown.set_model(model_list)
         self.model_dropdown.set_selected(selected_idx)
         model_box.append(self.model_dropdown)
 
         # System prompt
-        prompt_label = Gtk.Label(label=LABEL_SYSTEM_PROMPT)
-        prompt_label.set_halign(Gtk.Align.START)
-        prompt_label.add_css_class("heading")
-        prompt_label.set_margin_top(MARGIN_MEDIUM)
-        content_box.append(prompt_label)
+        content_box.append(_heading(LABEL_SYSTEM_PROMPT, MARGIN_MEDIUM))
 
         # Text view for system prompt
-        prompt_scroll = Gtk.ScrolledWindow()
-        prompt_scroll.set_min_content_height(200)
-        prompt_scroll.set_vexpand(True)
+        prompt_scroll = Gtk.ScrolledWindow(min_content_height=200, vexpand=True)
         content_box.append(prompt_scroll)
 
-        self.prompt_text = Gtk.TextView()
-        self.prompt_text.set_wrap_mode(Gtk.WrapMode.WORD_CHAR)
-        self.prompt_text.add_css_class("card")
-        self.prompt_text.set_left_margin(MARGIN_MEDIUM)
-        self.prompt_text.set_right_margin(MARGIN_MEDIUM)
-        self.prompt_text.set_top_margin(MARGIN_MEDIUM)
-        self.prompt_text.set_bottom_margin(MARGIN_MEDIUM)
+        self.prompt_text = Gtk.TextView(
+            wrap_mode=Gtk.WrapMode.WORD_CHAR,
+            left_margin=MARGIN_MEDIUM,
+            right_margin=MARGIN_MEDIUM,
+            top_margin=MARGIN_MEDIUM,
+            bottom_margin=MARGIN_MEDIUM,
+            css_classes=["card"],
+        )
+        # Keep a short undo history instead of every edit of a long prompt
+        buffer = self.prompt_text.get_buffer()
+        buffer.set_max_undo_levels(PROMPT_EDITOR_UNDO_LEVELS)
         if prompt:
-            self.prompt_text.get_buffer().set_text(prompt.system_prompt)
+            # The loaded text is not an edit to undo
+            buffer.begin_irreversible_action()
+            buffer.set_text(prompt.system_prompt)
+            buffer.end_irreversible_action()
         prompt_scroll.set_child(self.prompt_text)
 
+        return GLib.SOURCE_REMOVE
+
     def on_cancel(self, button):
         """Handle cancel button."""
         self.close()
 
+    def _on_cancel_shortcut(self, widget, args):
+        """Handle the cancel shortcut."""
+        self.on_cancel(None)
+        return True
+
+    def _on_save_shortcut(self, widget, args):
+        """Handle the save shortcut."""
+        self.on_save(None)
+        return True
+
     def on_save(self, button):
         """Handle save button."""
-        name = self.name_entry.get_text().strip()
+        # Nothing was entered yet if the form hasn't been built
+        if not hasattr(self, "name_entry"):
+            return
+
+        name = _trim(self.name_entry.get_text())
         if not name:
             self.show_error(ERROR_NO_NAME)
             return
 
         # Check if name already exists (and it's not the current prompt being edited)
         if self.prompt is None or name != self.prompt.name:
-            if self.settings.get_prompt(name):
+            if self.settings.has_prompt(name):
                 self.show_error(ERROR_NAME_EXISTS.format(name=name))
                 return
 
         buffer = self.prompt_text.get_buffer()
-        system_prompt = buffer.get_text(
-            buffer.get_start_iter(), buffer.get_end_iter(), False
-        ).strip()
+        # An empty buffer needs no copy into Python
+        if buffer.get_char_count() == 0:
+            self.show_error(ERROR_NO_SYSTEM_PROMPT)
+            return
+        start, end = buffer.get_bounds()
+        system_prompt = _trim(buffer.get_text(start, end, False))
 
         if not system_prompt:
             self.show_error(ERROR_NO_SYSTEM_PROMPT)
             return
 
-        description = self.desc_entry.get_text().strip()
+        description = _trim(self.desc_entry.get_text())
         if not description:
             description = None
 
@@ -959,8 +1274,7 @@ class PromptEditDialog(Adw.Window):
 
     def show_error(self, message: str):
         """Show an error dialog."""
-        dialog = Adw.MessageDialog.new(self)
-        dialog.set_heading("Error")
-        dialog.set_body(message)
-        dialog.add_response("ok", "OK")
-        dialog.present()
+        if self._error_dialog is None:
+            self._error_dialog = _new_error_dialog(self)
+        self._error_dialog.set_body(message)
+        self._error_dialog.present()
@@ -1,5 +1,8 @@
 """UI text strings for internationalization support."""
 
+import sys
+from types import MappingProxyType
+
 # Window Titles
 WINDOW_TITLE = "Popup AI"
 PREFERENCES_TITLE = "Preferences"
@@ -123,7 +126,7 @@ CONV_ROLE_USER = "User"
 CONV_ROLE_ASSISTANT = "Assistant"
 
 # Default Prompt Templates
-DEFAULT_PROMPTS = [
+DEFAULT_PROMPTS = (
     {
         "name": "Default",
         "system_prompt": "You are a helpful AI assistant.",
@@ -148,4 +151,15 @@ DEFAULT_PROMPTS = [
         "description": "For translation tasks",
         "default_model": None,
     },
-]
+)
+
+# Intern the strings, so widgets given the same label share one object, and
+# expose them read-only by name, e.g. for swapping in a translation
+STRINGS = MappingProxyType(
+    {
+        name: sys.intern(value)
+        for name, value in globals().items()
+        if name.isupper() and isinstance(value, str)
+    }
+)
+globals().update(STRINGS)
@@ -1,5 +1,7 @@
 """Main application window."""
 
+import re
+import html
 import time
 import uuid
 import asyncio
@@ -8,7 +10,13 @@ from pathlib import Path
 from typing import Optional
 from concurrent.futures import ThreadPoolExecutor
 
+try:
+    import uvloop
+except ImportError:  # Optional speedup; fall back to the default asyncio loop
+    uvloop = None
+
 import gi
+import markdown
 
 gi.require_version("Gtk", "4.0")
 gi.require_version("Adw", "1")
@@ -19,8 +27,13 @@ from gi.repository import Gtk, Adw, GLib, Gdk, Gio, WebKit
 from src.config import Settings, Conversation, ConversationMessage, ModelConfig
 from src.ai_service import create_ai_service, AIService, fetch_available_models
 from src.preferences import PreferencesWindow
-from src.html_template import generate_html_template
+from src.html_template import (
+    generate_chunk_update_js,
+    generate_html_template,
+    generate_messages_update_js,
+)
 from src.logger import get_logger
+from src.json_utils import dumps_str as _js_string
 from src.constants import (
     DEFAULT_WINDOW_WIDTH,
     DEFAULT_WINDOW_HEIGHT,
@@ -75,11 +88,241 @@ from src.ui_strings import (
     ERROR_NO_AI_SERVICE,
     ERROR_INIT_AI_SERVICE,
     ERROR_GENERATE_RESPONSE,
+    CONV_ROLE_USER,
+    CONV_ROLE_ASSISTANT,
+    TOOLTIP_COPY_SOURCE,
 )
 
 # Configure logging
 logger = get_logger(__name__)
 
+# Module-level bindings for functions called on every render
+_html_escape = html.escape
+
+# Markup for one conversation message. The static parts are built once here,
+# so each message only formats its own fields into it.
+_MESSAGE_TEMPLATE = f"""
+                <div class="message {{role_class}}">
+                    <div class="message-header">
+                        <span>{{role_display}} {{token_info_html}}</span>
+                        <button class="copy-btn" onclick="copyMessage('{{idx}}')" title="{TOOLTIP_COPY_SOURCE}">
+                            <svg width="16" height="16" viewBox="0 0 16 16" fill="currentColor">
+                                <path d="M4 2a2 2 0 0 1 2-2h8a2 2 0 0 1 2 2v8a2 2 0 0 1-2 2H6a2 2 0 0 1-2-2V2Z"/>
+                                <path d="M2 5a2 2 0 0 0-2 2v6a2 2 0 0 0 2 2h6a2 2 0 0 0 2-2v-1h1v1a3 3 0 0 1-3 3H2a3 3 0 0 1-3-3V7a3 3 0 0 1 3-3h1v1H2Z"/>
+                            </svg>
+                        </button>
+                    </div>
+                    <div class="message-content" id="msg-{{idx}}" data-raw="{{raw_content}}">{{content_html}}</div>
+                </div>
+                """
+
+# Same entities as html.escape, plus line breaks, so user messages need one pass
+_USER_CONTENT_TABLE = str.maketrans(
+    {
+        "&": "&amp;",
+        "<": "&lt;",
+        ">": "&gt;",
+        '"': "&quot;",
+        "'": "&#x27;",
+        "\n": "<br>",
+    }
+)
+
+# Runs of spaces, tabs and line breaks collapsed by _clean_input_text
+_WS_RE = re.compile(r"[ \t\r\n]+")
+
+# Markdown extensions used for assistant messages
+MARKDOWN_EXTENSIONS = ["fenced_code", "codehilite", "tables"]
+# Same without Pygments highlighting, for text that contains no code blocks
+MARKDOWN_EXTENSIONS_NO_CODE = ["fenced_code", "tables"]
+
+# Fences or indented lines; anything else cannot contain a code block
+_CODE_HINT_RE = re.compile(r"```|~~~|^(?: {4}|\t)", re.MULTILINE)
+
+# Block structure checks for IncrementalMarkdownRenderer
+_FENCE_OPEN_RE = re.compile(r" {0,3}(`{3,}|~{3,})")
+_LIST_MARKER_RE = re.compile(r"\s*(?:[-*+]|\d+[.)])(?:\s|$)")
+_REFERENCE_DEF_RE = re.compile(r" {0,3}\[[^\]]+\]:\s*\S")
+_BLOCKQUOTE_RE = re.compile(r" {0,3}>")
+_HTML_BLOCK_OPEN_RE = re.compile(r" {0,3}<([A-Za-z][A-Za-z0-9-]*)[\s/>]")
+
+# Per-thread markdown.Markdown parsers; instances are reusable but not thread-safe
+_md_local = threading.local()
+
+
+def _format_token_info(tokens_input: Optional[int], tokens_output: Optional[int]) -> str:
+    """Build the token usage badge shown in a message header.
+
+    Args:
+        tokens_input: Prompt tokens, if known
+        tokens_output: Completion tokens, if known
+
+    Returns:
+        The badge HTML, or an empty string when no counts are known
+    """
+    if tokens_input is None and tokens_output is None:
+        return ""
+
+    token_parts = []
+    if tokens_input is not None:
+        token_parts.append(f"Input: {tokens_input:,}")
+    if tokens_output is not None:
+        token_parts.append(f"Output: {tokens_output:,}")
+    if tokens_input is not None and tokens_output is not None:
+        total = tokens_input + tokens_output
+        token_parts.append(f"Total: {total:,}")
+    return f'<span class="token-info">{" | ".join(token_parts)}</span>'
+
+
+def _render_markdown(text: str) -> str:
+    """Render assistant message markdown to HTML.
+
+    Both the streaming path and the full page render go through here, so the
+    parser backend only has to be chosen in one place.
+    """
+    # Skip the codehilite pipeline for the common case of plain prose
+    if _CODE_HINT_RE.search(text):
+        attr, extensions = "md_code", MARKDOWN_EXTENSIONS
+    else:
+        attr, extensions = "md_simple", MARKDOWN_EXTENSIONS_NO_CODE
+
+    md = getattr(_md_local, attr, None)
+    if md is None:
+        # Extension setup happens once per thread instead of once per call
+        md = markdown.Markdown(extensions=extensions)
+        setattr(_md_local, attr, md)
+    return md.reset().convert(text)
+
+
+class IncrementalMarkdownRenderer:
+    """Render a growing markdown buffer, re-parsing only its unfinished tail.
+
+    A blank line outside a fenced code block ends the blocks before it once
+    the next line shows it can't continue them: a line that is indented or
+    starts a list item may belong to a loose list, a continuation paragraph or
+    an indented code block, so the boundary waits. A quote line after a
+    blockquote also waits, since the parser merges the two quotes, and no
+    boundary is confirmed inside a raw HTML block until its closing tag.
+    Text before a confirmed boundary is a complete set of blocks that further
+    tokens cannot change, so it is rendered once and kept. Each update then
+    only parses the rest.
+
+    Reference link definitions can change how earlier text renders, so once
+    one appears the whole buffer is rendered on every update.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Forget all rendered state (call before a new stream starts)."""
+        self._scanned = ""  # Text up to the end of the last complete line seen
+        self._fence: Optional[str] = None  # Marker of the open code fence
+        self._pending_boundary: Optional[int] = None  # End of a blank line run
+        self._block_is_quote: Optional[bool] = None  # None before any block
+        self._html_tag: Optional[str] = None  # Tag of the open raw HTML block
+        self._has_references = False
+        self._stable_len = 0  # Length of the prefix already rendered
+        self._stable_parts: list[str] = []
+        self._stable_html = ""
+
+    def _scan_line(self, line: str, line_end: int) -> Optional[int]:
+        """Update the block state with one complete line.
+
+        Args:
+            line: The line without its newline
+            line_end: Offset of the line's newline in the buffer
+
+        Returns:
+            A confirmed block boundary, or None
+        """
+        fence = self._fence
+        if fence is not None:
+            # Only a run of the same character, at least as long, closes it
+            stripped = line.strip()
+            if stripped.startswith(fence) and not stripped.strip(fence[0]):
+                self._fence = None
+            return None
+
+        html_tag = self._html_tag
+        if html_tag is not None:
+            # The block runs, blank lines included, up to its closing tag
+            if f"</{html_tag}" in line.lower():
+                self._html_tag = None
+            return None
+
+        if not line.strip():
+            self._pending_boundary = line_end + 1
+            return None
+
+        boundary = None
+        is_quote = bool(_BLOCKQUOTE_RE.match(line))
+        if self._block_is_quote is None:
+            self._block_is_quote = is_quote
+        elif self._pending_boundary is not None:
+            if (
+                not line[0].isspace()
+                and not _LIST_MARKER_RE.match(line)
+                and not (is_quote and self._block_is_quote)
+            ):
+                boundary = self._pending_boundary
+                self._block_is_quote = is_quote
+            self._pending_boundary = None
+
+        match = _FENCE_OPEN_RE.match(line)
+        if match:
+            self._fence = match.group(1)
+        elif _REFERENCE_DEF_RE.match(line):
+            self._has_references = True
+        else:
+            match = _HTML_BLOCK_OPEN_RE.match(line)
+            if match:
+                tag = match.group(1).lower()
+                if f"</{tag}" not in line[match.end():].lower():
+                    self._html_tag = tag
+        return boundary
+
+    def render(self, text: str) -> tuple[str, str]:
+        """Render the buffer.
+
+        Args:
+            text: The full markdown received so far
+
+        Returns:
+            Tuple of (stable_html, tail_html); stable_html only grows, except
+            that it becomes empty once a reference definition is seen
+        """
+        if not text.startswith(self._scanned):
+            # Not a continuation of the previous buffer
+            self.reset()
+
+        # Scan newly completed lines for fences and block boundaries
+        scan_pos = len(self._scanned)
+        boundary = self._stable_len
+        while True:
+            line_end = text.find("\n", scan_pos)
+            if line_end < 0:
+                break
+            line_boundary = self._scan_line(text[scan_pos:line_end], line_end)
+            if line_boundary is not None:
+                boundary = line_boundary
+            scan_pos = line_end + 1
+        if scan_pos != len(self._scanned):
+            self._scanned = text[:scan_pos]
+
+        if self._has_references:
+            return "", _render_markdown(text)
+
+        # Render blocks that became stable since the last call
+        if boundary > self._stable_len:
+            self._stable_parts.append(_render_markdown(text[self._stable_len : boundary]))
+            self._stable_html = "".join(self._stable_parts)
+            self._stable_len = boundary
+
+        tail = text[self._stable_len :]
+        tail_html = _render_markdown(tail) if tail.strip() else ""
+        return self._stable_html, tail_html
+
 
 class AsyncExecutor:
     """Shared async executor for running async tasks in a background thread."""
@@ -95,13 +338,19 @@ class AsyncExecutor:
 
     def __init__(self):
         """Initialize executor."""
-        self._loop = asyncio.new_event_loop()
+        # uvloop makes every await and socket read on the streaming path cheaper
+        self._loop = uvloop.new_event_loop() if uvloop else asyncio.new_event_loop()
         self._thread = threading.Thread(
             target=self._run_loop,
             name=f"{ASYNC_EXECUTOR_THREAD_PREFIX}-Loop",
             daemon=True,
         )
         self._thread.start()
+        # Plain worker threads for blocking, non-async work
+        self._pool = ThreadPoolExecutor(
+            max_workers=ASYNC_EXECUTOR_MAX_WORKERS,
+            thread_name_prefix=ASYNC_EXECUTOR_THREAD_PREFIX,
+        )
 
     def _run_loop(self):
         """Run the event loop."""
@@ -126,8 +375,13 @@ class AsyncExecutor:
         """Run a coroutine in the background thread."""
         return asyncio.run_coroutine_threadsafe(coro, self._loop)
 
+    def run_in_thread(self, func, *args):
+        """Run a blocking function in a worker thread."""
+        return self._pool.submit(func, *args)
+
     def shutdown(self):
         """Shutdown the executor."""
+        self._pool.shutdown(wait=False, cancel_futures=True)
         if self._loop.is_running():
             self._loop.call_soon_threadsafe(self._loop.stop)
         if self._thread.is_alive():
@@ -150,10 +404,33 @@ class PopupAIWindow(Adw.ApplicationWindow):
         self.user_scrolled = False  # Track if user manually scrolled during generation
         self.async_executor = AsyncExecutor.get_instance()
         self._last_html_hash = None  # Cache for HTML to avoid unnecessary redraws
+        # (font_family, font_size, is_dark) of the page in the WebView, and
+        # whether it has finished loading
+        self._page_shell_key: Optional[tuple] = None
+        self._page_loaded = False
+        # Conversation whose messages the page shows, and a counter bumped by
+        # every _update_webview call so stale background renders are dropped
+        self._shown_conversation: Optional[Conversation] = None
+        self._webview_update_serial = 0
+        self._prefs_window: Optional[PreferencesWindow] = None  # Created on first open
+        self._current_ui_font: Optional[str] = None  # Last font applied by _apply_ui_font
+        self._font_css_provider: Optional[Gtk.CssProvider] = None
+        self._stream_renderer = IncrementalMarkdownRenderer()
+        self._pending_update = False  # A streaming UI update is queued on the main loop
+        self._sent_stable_html = ""  # Stable streamed HTML already present in the page
+        self._sent_raw_len = 0  # Length of the streamed source already in the page
+        # Inputs and output of the last _generate_messages_html call
+        self._last_gen_fp: Optional[tuple] = None
+        self._last_gen_html = ""
+        # Rendered assistant markdown keyed by id(message): (content, html)
+        self._rendered_cache: dict[int, tuple[str, str]] = {}
 
         # Load custom CSS
         self._load_css()
 
+        # Theme and font values for the conversation page
+        self._refresh_webview_style()
+
         # Set default window size
         self.set_default_size(
             self.settings.get("window_width", DEFAULT_WINDOW_WIDTH),
@@ -201,8 +478,8 @@ class PopupAIWindow(Adw.ApplicationWindow):
             # Get UI font settings
             ui_font = self.settings.get("ui_font_family", "Sans 11")
 
-            # Check if font changed
-            if hasattr(self, "_current_ui_font") and self._current_ui_font == ui_font:
+            # Skip the global restyle if the font hasn't changed
+            if self._current_ui_font == ui_font:
                 return
             self._current_ui_font = ui_font
 
@@ -218,8 +495,8 @@ class PopupAIWindow(Adw.ApplicationWindow):
             }}
             """
 
-            # Create or update the font CSS provider
-            if not hasattr(self, "_font_css_provider"):
+            # Register the provider once; later changes only reload its data
+            if self._font_css_provider is None:
                 self._font_css_provider = Gtk.CssProvider()
                 Gtk.StyleContext.add_provider_for_display(
                     Gdk.Display.get_default(),
@@ -395,13 +672,12 @@ class PopupAIWindow(Adw.ApplicationWindow):
         content_manager = self.webview.get_user_content_manager()
         content_manager.register_script_message_handler("scrolled")
         content_manager.connect("script-message-received::scrolled", self._on_user_scrolled)
+        self.webview.connect("load-changed", self._on_webview_load_changed)
 
         scrolled.set_child(self.webview)
 
         # Pre-load initial HTML template to avoid delay
-        initial_html = self._generate_html()
-        self.webview.load_html(initial_html, "file:///")
-        self._last_html_hash = hash(initial_html)
+        self._load_conversation_html(force=True)
 
         # Input area
         input_frame = Adw.Clamp()
@@ -684,13 +960,9 @@ class PopupAIWindow(Adw.ApplicationWindow):
         self.update_model_list()
 
     def load_conversation_history(self):
-        """Load conversation history into si    debar."""
-        # Clear existing items
-        child = self.conv_list_box.get_first_child()
-        while child:
-            next_child = child.get_next_sibling()
-            self.conv_list_box.remove(child)
-            child = next_child
+        """Load conversation history into sidebar."""
+        # Clear existing items in one call instead of walking the siblings
+        self.conv_list_box.remove_all()
 
         # Load conversations
         conversations = self.settings.load_conversations()
@@ -754,6 +1026,7 @@ class PopupAIWindow(Adw.ApplicationWindow):
             if conv.id == row.conversation_id:
                 self.current_conversation = conv
                 self._last_html_hash = None
+                self._rendered_cache.clear()
                 self._update_webview(force=True)
                 # Ensure the row is selected
                 self.conv_list_box.select_row(row)
@@ -786,12 +1059,8 @@ class PopupAIWindow(Adw.ApplicationWindow):
     def on_clear_all_history_response(self, dialog, response):
         """Handle confirmation dialog response."""
         if response == "delete":
-            # Get all conversations
-            conversations = self.settings.load_conversations()
-
-            # Delete each conversation
-            for conv in conversations:
-                self.settings.delete_conversation(conv.id)
+            # Delete all conversations in one pass
+            self.settings.delete_all_conversations()
 
             # Start a new conversation
             self.start_new_conversation()
@@ -820,6 +1089,7 @@ class PopupAIWindow(Adw.ApplicationWindow):
             updated_at=time.time(),
         )
         self._last_html_hash = None  # Reset HTML cache
+        self._rendered_cache.clear()
         self._update_webview()
 
     def _on_user_scrolled(self, content_manager, result):
@@ -833,13 +1103,158 @@ class PopupAIWindow(Adw.ApplicationWindow):
         Args:
             force: Force update even if HTML hasn't changed
         """
-        html = self._generate_html()
+        self._webview_update_serial += 1
+
+        # Render uncached assistant messages in a worker so long conversations
+        # don't block the main loop. While generating, the page has to be in
+        # place before streaming updates arrive, so it is built inline.
+        if not self.is_generating:
+            pending = self._uncached_assistant_messages()
+            if pending:
+                # Don't leave another conversation on screen while rendering
+                if self._page_loaded and self._shown_conversation is not self.current_conversation:
+                    self._clear_webview_messages()
+                self.async_executor.run_in_thread(
+                    self._warm_render_cache,
+                    pending,
+                    force,
+                    self._webview_update_serial,
+                    self.current_conversation,
+                )
+                return
+
+        self._load_conversation_html(force)
+
+    def _uncached_assistant_messages(self) -> list[tuple[ConversationMessage, str]]:
+        """Get assistant messages whose rendered HTML is not cached yet."""
+        if not self.current_conversation:
+            return []
+
+        pending = []
+        for msg in self.current_conversation.messages:
+            if msg.role != "assistant":
+                continue
+            cached = self._rendered_cache.get(id(msg))
+            if cached is None or cached[0] != msg.content:
+                pending.append((msg, msg.content))
+        return pending
+
+    def _warm_render_cache(
+        self,
+        pending: list[tuple[ConversationMessage, str]],
+        force: bool,
+        serial: int,
+        conversation: Optional[Conversation],
+    ):
+        """Render messages into the cache, then rebuild the page (worker thread).
+
+        Args:
+            pending: Messages to render, with the content captured on the main thread
+            force: Passed through to the page rebuild
+            serial: Value of _webview_update_serial when the work was scheduled
+            conversation: Conversation the messages belong to
+        """
+        try:
+            for msg, content in pending:
+                self._render_message_markdown(msg, content)
+        except Exception as e:
+            # Whatever is still missing gets rendered inline by the rebuild
+            logger.error(f"Failed to render messages in background: {e}")
+        GLib.idle_add(self._finish_warm_render, force, serial, conversation)
+
+    def _finish_warm_render(
+        self, force: bool, serial: int, conversation: Optional[Conversation]
+    ):
+        """Rebuild the page after a background render, unless it's outdated (idle callback).
+
+        A later update, a conversation switch or a started response means the
+        page has already moved on; reloading it here would overwrite that.
+
+        Args:
+            force: Passed through to the page rebuild
+            serial: Value of _webview_update_serial when the work was scheduled
+            conversation: Conversation the render was for
+        """
+        if (
+            serial == self._webview_update_serial
+            and conversation is self.current_conversation
+            and not self.is_generating
+        ):
+            self._load_conversation_html(force)
+        return GLib.SOURCE_REMOVE
+
+    def _clear_webview_messages(self):
+        """Empty the page's messages until the current conversation is rendered."""
+        self._last_html_hash = None
+        self._sent_stable_html = ""
+        self._shown_conversation = None
+        js_code = generate_messages_update_js("", self.user_scrolled)
+        try:
+            self.webview.evaluate_javascript(js_code, -1, None, None, None)
+        except Exception as e:
+            logger.warning(f"Failed to clear messages: {e}")
+
+    def _load_conversation_html(self, force=False):
+        """Show the current conversation in the WebView.
+
+        The page is loaded once per font and theme; after that only its
+        messages are replaced through JavaScript.
+
+        Args:
+            force: Force update even if HTML hasn't changed
+        """
+        messages_html = self._generate_messages_html()
+        shell_key = (self._font_family, self._font_size, self._is_dark)
 
         # Only update if HTML changed or forced
-        html_hash = hash(html)
-        if force or html_hash != self._last_html_hash:
-            self._last_html_hash = html_hash
-            self.webview.load_html(html, "file:///")
+        html_hash = hash((shell_key, messages_html, self.user_scrolled))
+        if not force and html_hash == self._last_html_hash:
+            return False
+        self._last_html_hash = html_hash
+        # The new content has none of the streamed blocks
+        self._sent_stable_html = ""
+        self._shown_conversation = self.current_conversation
+
+        if self._page_loaded and shell_key == self._page_shell_key:
+            js_code = generate_messages_update_js(messages_html, self.user_scrolled)
+            try:
+                self.webview.evaluate_javascript(js_code, -1, None, None, None)
+                return False
+            except Exception as e:
+                logger.warning(f"Failed to replace messages via JS, reloading: {e}")
+
+        html = generate_html_template(
+            messages_html=messages_html,
+            font_family=self._font_family,
+            font_size=self._font_size,
+            is_dark=self._is_dark,
+            user_scrolled=self.user_scrolled,
+        )
+        self._page_shell_key = shell_key
+        self._page_loaded = False
+        self.webview.load_bytes(GLib.Bytes.new(html), "text/html", "utf-8", "file:///")
+        return False
+
+    def _on_webview_load_changed(self, webview, load_event):
+        """Track whether the page is ready to receive JavaScript updates."""
+        if load_event == WebKit.LoadEvent.FINISHED:
+            self._page_loaded = True
+
+    def _flush_streaming_update(self, response_chunks: list[str]):
+        """Push the latest streamed content to the WebView (idle callback).
+
+        Args:
+            response_chunks: The chunk list the stream keeps appending to
+        """
+        self._pending_update = False
+        # Join only here, once per UI update, rather than in the stream loop
+        self.streaming_content = "".join(response_chunks)
+
+        # Update the last message in conversation
+        if self.current_conversation and self.current_conversation.messages:
+            self.current_conversation.messages[-1].content = self.streaming_content
+            self._update_streaming_content(self.streaming_content)
+        return False
 
     def _update_streaming_content(self, content: str):
         """Update streaming content via JavaScript without reloading page.
@@ -847,68 +1262,95 @@ class PopupAIWindow(Adw.ApplicationWindow):
         Args:
             content: The new content to display
         """
-        import markdown
-        import json
-
-        # Convert markdown to HTML
-        content_html = markdown.markdown(
-            content, extensions=["fenced_code", "codehilite", "tables"]
+        # Convert markdown to HTML; only the unfinished tail is re-parsed
+        stable_html, tail_html = self._stream_renderer.render(content)
+
+        # Send only the stable blocks the page doesn't have yet. Start over if
+        # the page was reloaded or the stable part no longer extends what we sent.
+        sent = self._sent_stable_html
+        reset = not sent or not stable_html.startswith(sent)
+        stable_delta = stable_html if reset else stable_html[len(sent) :]
+        self._sent_stable_html = stable_html
+
+        # The source for the copy button grows the same way; a reset resends it
+        raw_delta = content if reset else content[self._sent_raw_len :]
+        self._sent_raw_len = len(content)
+
+        # The update logic lives in the page; only the call is evaluated here
+        js_code = generate_chunk_update_js(
+            len(self.current_conversation.messages) - 1,
+            stable_delta,
+            tail_html,
+            raw_delta,
+            reset,
+            self.user_scrolled,
         )
 
-        # Use JSON.stringify to properly escape the strings
-        escaped_content = json.dumps(content_html)
-        escaped_raw = json.dumps(content)
-
-        # JavaScript to update the last message
-        js_code = f"""
-        (function() {{
-            var messages = document.querySelectorAll('.message-content');
-            if (messages.length > 0) {{
-                var lastMessage = messages[messages.length - 1];
-                lastMessage.innerHTML = {escaped_content};
-                lastMessage.setAttribute('data-raw', {escaped_raw});
-                
-                // Re-render MathJax if available (debounced)
-                if (typeof MathJax !== 'undefined' && MathJax.typesetPromise) {{
-                    if (window.mathJaxTimeout) clearTimeout(window.mathJaxTimeout);
-                    window.mathJaxTimeout = setTimeout(function() {{
-                        MathJax.typesetPromise([lastMessage]).catch(function(err) {{
-                            console.error('MathJax error:', err);
-                        }});
-                    }}, 100);
-                }}
-                
-                // Auto-scroll if user hasn't scrolled manually
-                var userScrolledFlag = {str(self.user_scrolled).lower()};
-                if (!userScrolledFlag) {{
-                    var anchor = document.getElementById('scroll-anchor');
-                    if (anchor) {{
-                        anchor.scrollIntoView({{block: 'end', behavior: 'auto'}});
-                    }}
-                }}
-            }}
-        }})();
-        """
-
         try:
             self.webview.evaluate_javascript(js_code, -1, None, None, None)
         except Exception as e:
             logger.warning(f"Failed to update streaming content via JS: {e}")
 
-    def _generate_html(self) -> str:
-        """Generate HTML for the conversation."""
-        import html
-        import markdown
-        from src.ui_strings import CONV_ROLE_USER, CONV_ROLE_ASSISTANT, TOOLTIP_COPY_SOURCE
+    def _update_token_info_js(self):
+        """Show the completed response and its token counts without reloading.
+
+        Swaps the streamed content of the last message for its full render and
+        patches the token badges of the last two messages in place.
+        """
+        if not self.current_conversation or not self.current_conversation.messages:
+            return False
+
+        messages = self.current_conversation.messages
+        last_msg = messages[-1]
+        content_html = self._render_message_markdown(last_msg, last_msg.content)
+
+        js_parts = [
+            f"finishStreamingMessage({len(messages) - 1}, {_js_string(content_html)}, "
+            f"{_js_string(last_msg.content)}, {str(self.user_scrolled).lower()});"
+        ]
+        for idx in range(max(0, len(messages) - 2), len(messages)):
+            msg = messages[idx]
+            token_info_html = _format_token_info(msg.tokens_input, msg.tokens_output)
+            js_parts.append(f"setTokenInfo({idx}, {_js_string(token_info_html)});")
 
+        # The page no longer matches the last full render
+        self._last_html_hash = None
+
+        try:
+            self.webview.evaluate_javascript("".join(js_parts), -1, None, None, None)
+        except Exception as e:
+            logger.warning(f"Failed to update token info via JS: {e}")
+        return False
+
+    def _render_message_markdown(self, msg, content: str) -> str:
+        """Render an assistant message, reusing the cached HTML when unchanged.
+
+        Args:
+            msg: The conversation message being rendered
+            content: The message content
+
+        Returns:
+            The rendered HTML
+        """
+        key = id(msg)
+        cached = self._rendered_cache.get(key)
+        # Comparing content also guards against a recycled id()
+        if cached is not None and cached[0] == content:
+            return cached[1]
+
+        content_html = _render_markdown(content)
+        self._rendered_cache[key] = (content, content_html)
+        return content_html
+
+    def _refresh_webview_style(self):
+        """Re-read the theme and WebView font settings used for the page."""
         # Detect dark mode
         style_manager = Adw.StyleManager.get_default()
-        is_dark = style_manager.get_dark()
+        self._is_dark = style_manager.get_dark()
 
         # Get font settings
+        # Always a list, normalized when the settings file is loaded
         font_families = self.settings.get("webview_font_families", ["Sans"])
-        if not isinstance(font_families, list):
-            font_families = [str(font_families)]
 
         # Build CSS font-family string with fallbacks
         # Quote font names that contain spaces
@@ -920,15 +1362,39 @@ class PopupAIWindow(Adw.ApplicationWindow):
                 quoted_fonts.append(font)
 
         # Add generic fallbacks
-        font_family = ", ".join(quoted_fonts)
-        font_size = self.settings.get("webview_font_size", 14)
+        self._font_family = ", ".join(quoted_fonts)
+        self._font_size = self.settings.get("webview_font_size", 14)
+
+    def _generate_messages_html(self) -> str:
+        """Generate the HTML of the conversation's messages."""
+        # Theme and font settings are cached by _refresh_webview_style
+        is_dark = self._is_dark
+        font_size = self._font_size
+
+        messages = self.current_conversation.messages if self.current_conversation else []
+
+        # Only the last message changes between refreshes of one conversation,
+        # so return the previous HTML if none of the inputs moved
+        last_msg = messages[-1] if messages else None
+        fingerprint = (
+            id(self.current_conversation),
+            len(messages),
+            last_msg.content if last_msg else None,
+            last_msg.tokens_input if last_msg else None,
+            last_msg.tokens_output if last_msg else None,
+            is_dark,
+            font_size,
+        )
+        if fingerprint == self._last_gen_fp:
+            return self._last_gen_html
 
-        messages_html = ""
+        message_parts: list[str] = []
 
         # Show welcome message if no messages
-        if not self.current_conversation or not self.current_conversation.messages:
+        if not messages:
             welcome_color = "rgba(255, 255, 255, 0.5)" if is_dark else "rgba(0, 0, 0, 0.3)"
-            messages_html = f"""
+            message_parts.append(
+                f"""
             <div style="
                 display: flex;
                 align-items: center;
@@ -946,57 +1412,46 @@ class PopupAIWindow(Adw.ApplicationWindow):
                 </div>
             </div>
             """
-        elif self.current_conversation and self.current_conversation.messages:
-            for idx, msg in enumerate(self.current_conversation.messages):
-                role_class = "user" if msg.role == "user" else "assistant"
+            )
+        else:
+            for idx, msg in enumerate(messages):
+                # Read each field once; the loop below refers to the locals only
+                role = msg.role
+                content = msg.content
+                tokens_input = msg.tokens_input
+                tokens_output = msg.tokens_output
+
+                is_user = role == "user"
+                role_class = "user" if is_user else "assistant"
                 # Escape the raw content for data attribute
-                raw_content = html.escape(msg.content, quote=True)
+                raw_content = _html_escape(content, quote=True)
 
                 # Convert markdown to HTML for assistant messages
-                if msg.role == "assistant":
-                    content_html = markdown.markdown(
-                        msg.content, extensions=["fenced_code", "codehilite", "tables"]
-                    )
+                if role == "assistant":
+                    content_html = self._render_message_markdown(msg, content)
                 else:
-                    content_html = html.escape(msg.content).replace("\n", "<br>")
+                    content_html = content.translate(_USER_CONTENT_TABLE)
 
-                role_display = CONV_ROLE_USER if msg.role == "user" else CONV_ROLE_ASSISTANT
+                role_display = CONV_ROLE_USER if is_user else CONV_ROLE_ASSISTANT
 
                 # Build token info display
-                token_info_html = ""
-                if msg.tokens_input is not None or msg.tokens_output is not None:
-                    token_parts = []
-                    if msg.tokens_input is not None:
-                        token_parts.append(f"Input: {msg.tokens_input:,}")
-                    if msg.tokens_output is not None:
-                        token_parts.append(f"Output: {msg.tokens_output:,}")
-                    if msg.tokens_input is not None and msg.tokens_output is not None:
-                        total = msg.tokens_input + msg.tokens_output
-                        token_parts.append(f"Total: {total:,}")
-                    token_info_html = f'<span class="token-info">{" | ".join(token_parts)}</span>'
-
-                messages_html += f"""
-                <div class="message {role_class}">
-                    <div class="message-header">
-                        <span>{role_display} {token_info_html}</span>
-                        <button class="copy-btn" onclick="copyMessage('{idx}')" title="{TOOLTIP_COPY_SOURCE}">
-                            <svg width="16" height="16" viewBox="0 0 16 16" fill="currentColor">
-                                <path d="M4 2a2 2 0 0 1 2-2h8a2 2 0 0 1 2 2v8a2 2 0 0 1-2 2H6a2 2 0 0 1-2-2V2Z"/>
-                                <path d="M2 5a2 2 0 0 0-2 2v6a2 2 0 0 0 2 2h6a2 2 0 0 0 2-2v-1h1v1a3 3 0 0 1-3 3H2a3 3 0 0 1-3-3V7a3 3 0 0 1 3-3h1v1H2Z"/>
-                            </svg>
-                        </button>
-                    </div>
-                    <div class="message-content" data-raw="{raw_content}">{content_html}</div>
-                </div>
-                """
+                token_info_html = _format_token_info(tokens_input, tokens_output)
+
+                message_parts.append(
+                    _MESSAGE_TEMPLATE.format(
+                        idx=idx,
+                        role_class=role_class,
+                        role_display=role_display,
+                        token_info_html=token_info_html,
+                        raw_content=raw_content,
+                        content_html=content_html,
+                    )
+                )
 
-        return generate_html_template(
-            messages_html=messages_html,
-            font_family=font_family,
-            font_size=font_size,
-            is_dark=is_dark,
-            user_scrolled=self.user_scrolled,
-        )
+        html = "".join(message_parts)
+        self._last_gen_fp = fingerprint
+        self._last_gen_html = html
+        return html
 
     def clear_conversation_view(self):
         """Clear the conversation view."""
@@ -1093,19 +1548,18 @@ class PopupAIWindow(Adw.ApplicationWindow):
         if selected_idx < len(self.settings.prompts):
             system_prompt = self.settings.prompts[selected_idx].system_prompt
 
-        # Prepare messages with context limit
-        all_messages = conversation.messages
-
-        if len(all_messages) > MAX_CONTEXT_MESSAGES:
-            messages = [
-                {"role": msg.role, "content": msg.content}
-                for msg in all_messages[-MAX_CONTEXT_MESSAGES:]
-            ]
-        else:
-            messages = [{"role": msg.role, "content": msg.content} for msg in all_messages]
+        # Prepare messages with context limit; the slice already covers short
+        # conversations, and only the last MAX_CONTEXT_MESSAGES are visited
+        messages = [
+            {"role": msg.role, "content": msg.content}
+            for msg in conversation.messages[-MAX_CONTEXT_MESSAGES:]
+        ]
 
         # Add placeholder for streaming message
         self.streaming_content = ""
+        self._stream_renderer.reset()
+        self._pending_update = False
+        self._sent_stable_html = ""
         placeholder_msg = ConversationMessage(
             role="assistant",
             content="...",  # Add loading indicator
@@ -1121,8 +1575,8 @@ class PopupAIWindow(Adw.ApplicationWindow):
     async def stream_response(self, messages, system_prompt):
         """Stream AI response."""
         response_chunks = []
-        chunk_count = 0
-        update_frequency = 3  # Update every N chunks instead of time-based
+        next_update_ts = 0.0
+        completed = False
 
         # Capture the service instance to avoid race conditions if settings change
         ai_service = self.ai_service
@@ -1139,17 +1593,15 @@ class PopupAIWindow(Adw.ApplicationWindow):
                     break
 
                 response_chunks.append(chunk)
-                chunk_count += 1
-
-                # Update UI every N chunks for consistent performance
-                if chunk_count >= update_frequency:
-                    full_response = "".join(response_chunks)
-                    # Update the last message in conversation
-                    if self.current_conversation and self.current_conversation.messages:
-                        self.current_conversation.messages[-1].content = full_response
-                        # Use JavaScript to update content without reloading entire page
-                        GLib.idle_add(self._update_streaming_content, full_response)
-                    chunk_count = 0
+
+                # Update UI at most once per interval, however fast chunks arrive
+                now = time.monotonic()
+                if now >= next_update_ts:
+                    next_update_ts = now + STREAMING_UPDATE_INTERVAL
+                    # Coalesce: a queued update joins whatever chunks exist when it runs
+                    if not self._pending_update:
+                        self._pending_update = True
+                        GLib.idle_add(self._flush_streaming_update, response_chunks)
 
             # Final update with complete response
             full_response = "".join(response_chunks)
@@ -1184,21 +1636,31 @@ class PopupAIWindow(Adw.ApplicationWindow):
                     f"Response completed. Tokens: input={tokens_input}, output={tokens_output}"
                 )
 
-                # Force reload to show token info
-                GLib.idle_add(self._update_webview, True)
-
                 # Save conversation
                 self.settings.save_conversation(self.current_conversation)
-
-                # Update conversation list in sidebar
-                GLib.idle_add(self.load_conversation_history)
+                completed = True
 
         except Exception as e:
             logger.error(f"Error generating response: {e}", exc_info=True)
             GLib.idle_add(self.show_error, ERROR_GENERATE_RESPONSE.format(error=e))
 
         finally:
-            GLib.idle_add(self.reset_ui_state)
+            # One main-loop callback for all end-of-response UI work
+            GLib.idle_add(self._finalize_response, completed)
+
+    def _finalize_response(self, completed: bool):
+        """Update the UI once a response has ended (idle callback).
+
+        Args:
+            completed: Whether a response was received and saved
+        """
+        if completed:
+            # Show the final render and token info without reloading the page
+            self._update_token_info_js()
+            # Update conversation list in sidebar
+            self.load_conversation_history()
+        self.reset_ui_state()
+        return False
 
     def reset_ui_state(self):
         """Reset UI state after generation."""
@@ -1246,15 +1708,8 @@ class PopupAIWindow(Adw.ApplicationWindow):
         - Collapse multiple spaces into one
         - Strip leading and trailing whitespace
         """
-        import re
-
-        # Replace newlines and tabs with spaces
-        text = text.replace("\n", " ").replace("\r", " ").replace("\t", " ")
-        # Collapse multiple spaces into one
-        text = re.sub(r" +", " ", text)
-        # Strip leading and trailing whitespace
-        text = text.strip()
-        return text
+        # Turn every run of spaces, tabs and newlines into one space in one pass
+        return _WS_RE.sub(" ", text).strip()
 
     def set_initial_text(self, text: str):
         """Set initial text in the input area."""
@@ -1277,9 +1732,16 @@ class PopupAIWindow(Adw.ApplicationWindow):
         self.input_text.grab_focus()
 
     def show_preferences(self):
-        """Show preferences window."""
-        prefs = PreferencesWindow(self, self.settings, self.on_settings_changed)
-        prefs.present()
+        """Show preferences window.
+
+        The window is created on first use and only hidden when closed, so
+        later opens just reload its values.
+        """
+        if self._prefs_window is None:
+            self._prefs_window = PreferencesWindow(self, self.settings, self.on_settings_changed)
+        else:
+            self._prefs_window.populate()
+        self._prefs_window.present()
 
     def on_settings_changed(self):
         """Handle settings changes from preferences window."""
@@ -1301,12 +1763,14 @@ class PopupAIWindow(Adw.ApplicationWindow):
                 )
 
         # Refresh webview with new font settings
+        self._refresh_webview_style()
         self._last_html_hash = None  # Clear cache to force redraw
         self._update_webview(force=True)
 
     def on_theme_changed(self, style_manager, param):
         """Handle system theme changes (light/dark mode)."""
         # Clear HTML cache and force WebView update to use new theme colors
+        self._refresh_webview_style()
         self._last_html_hash = None
         self._update_webview(force=True)
 